@@ -0,0 +1,296 @@
+"""
+Benchmark of the validator on synthetic traces. The timings, the throughput
+and the peak memory are reported as JSON, so that they can be compared
+between versions.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from google.protobuf.internal import api_implementation
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import osi_trace_generator
+from osivalidator import osi_general_validator
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+def command_line_arguments():
+    """Define and handle command line interface"""
+
+    dir_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the validator on synthetic traces.",
+        prog="python3 benchmarks/osi_benchmark.py",
+    )
+    parser.add_argument(
+        "--rules",
+        "-r",
+        help="Directory with yml files containing rules.",
+        default=os.path.join(dir_path, "rules"),
+        type=str,
+    )
+    parser.add_argument(
+        "--type",
+        "-t",
+        help="Message types of the benchmarked traces.",
+        nargs="+",
+        choices=list(osi_trace_generator.MESSAGE_TYPES),
+        default=list(osi_trace_generator.MESSAGE_TYPES),
+    )
+    parser.add_argument(
+        "--repeat",
+        help="Number of times the rules are loaded to time it.",
+        default=5,
+        type=int,
+    )
+    parser.add_argument(
+        "--allocation-messages",
+        help="Number of messages whose memory allocations are traced after the "
+        "timed validation of a trace. If 0, the allocations are not traced.",
+        default=10,
+        type=int,
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        help="Path of the JSON report. Default is the standard output.",
+        default=None,
+        type=str,
+    )
+    osi_trace_generator.add_trace_arguments(parser)
+
+    return parser.parse_args()
+
+
+def get_peak_rss():
+    """Return the peak resident set size of the process in bytes, or None if
+    it is not available"""
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # In bytes on macOS, in kilobytes otherwise
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def load_rules(rules_path, cache_path=None):
+    """Collect the rules into the state of the validator and return the time
+    it took"""
+    start = time.perf_counter()
+    rules = osi_general_validator.osi_rules.OSIRules()
+    rules.from_yaml_directory(rules_path, cache_path)
+    duration = time.perf_counter() - start
+
+    osi_general_validator.VALIDATION_RULES = rules
+    return duration
+
+
+def benchmark_rule_loading(rules_path, repeat):
+    """Time the collection of the rules from the rule files and from the
+    rules cache (best of repeat)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, "rules_cache")
+        uncached = min(load_rules(rules_path) for _ in range(repeat))
+        # The first load fills the cache
+        load_rules(rules_path, cache_path)
+        cached = min(load_rules(rules_path, cache_path) for _ in range(repeat))
+
+    return {"uncached_s": uncached, "cached_s": cached}
+
+
+def reset_validator():
+    """Reset the state of the validator before validating a trace"""
+    validator = osi_general_validator
+    validator.LOGS = validator.osi_validator_logger.OSILogAggregator()
+    validator.RULE_CHECKER = validator.osi_rules_checker.OSIRulesChecker(
+        validator.LOGGER
+    )
+
+
+def benchmark_allocations(path, data_type, count):
+    """Trace the memory allocated by process_message for the first count
+    messages of a trace, after a first untraced message. Return the mean and
+    the maximum of the peaks of the traced memory in bytes per message."""
+    message_type = osi_trace_generator.MESSAGE_TYPES[data_type]
+    validator = osi_general_validator
+    reset_validator()
+
+    peaks = []
+    trace = validator.osi_trace_reader.OSITraceReader(path, message_type)
+    try:
+        for index, message in enumerate(trace):
+            if index > count:
+                break
+            if index > 0:
+                tracemalloc.start()
+            validator.process_message(message, index, data_type)
+            if index > 0:
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+    finally:
+        trace.close()
+
+    if not peaks:
+        return None
+    return {
+        "messages": len(peaks),
+        "mean_peak_bytes": sum(peaks) / len(peaks),
+        "max_peak_bytes": max(peaks),
+    }
+
+
+def benchmark_trace(path, data_type, allocation_messages=0):
+    """Validate a trace and time the decoding and the processing of its
+    messages and the synthesis of the logs. The allocations of process_message
+    are traced afterwards for allocation_messages messages, see
+    benchmark_allocations."""
+    message_type = osi_trace_generator.MESSAGE_TYPES[data_type]
+    validator = osi_general_validator
+
+    # Each trace is validated from a clean state
+    reset_validator()
+
+    # The messages are decoded and processed one at a time like in the
+    # validator, so that the peak memory does not include the whole trace
+    trace = validator.osi_trace_reader.OSITraceReader(path, message_type)
+    messages = iter(trace)
+    decode = process = 0.0
+    message_count = 0
+    while True:
+        start = time.perf_counter()
+        message = next(messages, None)
+        decode += time.perf_counter() - start
+        if message is None:
+            break
+
+        start = time.perf_counter()
+        validator.LOGS.extend(
+            validator.process_message(message, message_count, data_type)
+        )
+        process += time.perf_counter() - start
+        message_count += 1
+    trace.close()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        validator.display_results()
+    synthesis = time.perf_counter() - start
+    logged_messages = len(validator.LOGS)
+
+    return {
+        "type": data_type,
+        "messages": message_count,
+        "trace_bytes": os.path.getsize(path),
+        "decode_s": decode,
+        "process_message_s": process,
+        "messages_per_second": message_count / process if process else None,
+        "synthesis_s": synthesis,
+        "logged_messages": logged_messages,
+        # Traced after the timings, as tracing slows down the allocations
+        "process_message_allocations": (
+            benchmark_allocations(path, data_type, allocation_messages)
+            if allocation_messages
+            else None
+        ),
+    }
+
+
+def benchmark_trace_process(
+    path, data_type, rules_path, cache_path, log_dir, allocation_messages
+):
+    """Benchmark a trace in a new process, see benchmark_trace, and add the
+    peak memory of the process to the results, so that it is not the peak of
+    a previous trace"""
+    osi_general_validator.LOGGER.init(False, False, log_dir)
+    load_rules(rules_path, cache_path)
+    results = benchmark_trace(path, data_type, allocation_messages)
+    # Peak of the process validating this trace only, rules included
+    results["peak_rss_bytes"] = get_peak_rss()
+
+    # The log files are closed before the directory is removed
+    for handler in list(osi_general_validator.LOGGER.logger.handlers):
+        handler.close()
+        osi_general_validator.LOGGER.logger.removeHandler(handler)
+    return results
+
+
+def main():
+    """Main method"""
+    args = command_line_arguments()
+
+    # Each trace is validated in a new process, see benchmark_trace_process
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report = {
+            "python": platform.python_version(),
+            "protobuf_implementation": api_implementation.Type(),
+            "parameters": {
+                "frames": args.frames,
+                "objects": args.objects,
+                "lanes": args.lanes,
+                "points": args.points,
+                "seed": args.seed,
+            },
+            "rule_loading": benchmark_rule_loading(args.rules, args.repeat),
+            "traces": [],
+        }
+
+        for data_type in args.type:
+            path = os.path.join(
+                tmp_dir,
+                osi_trace_generator.get_trace_name(
+                    data_type, args.frames, args.objects, args.lanes, args.points
+                ),
+            )
+            osi_trace_generator.write_trace(
+                path,
+                data_type,
+                args.frames,
+                args.objects,
+                args.lanes,
+                args.points,
+                args.seed,
+            )
+            with context.Pool(1) as pool:
+                report["traces"].append(
+                    pool.apply(
+                        benchmark_trace_process,
+                        (
+                            path,
+                            data_type,
+                            args.rules,
+                            os.path.join(tmp_dir, "rules_cache"),
+                            tmp_dir,
+                            args.allocation_messages,
+                        ),
+                    )
+                )
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
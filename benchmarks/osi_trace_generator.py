@@ -0,0 +1,200 @@
+"""
+Generator of deterministic synthetic OSI traces for the benchmarks of the
+validator.
+"""
+
+import argparse
+import math
+import os
+import random
+import struct
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+from osi3.osi_sensordata_pb2 import SensorData
+from osi3.osi_sensorview_pb2 import SensorView
+
+MESSAGE_TYPES = {
+    "SensorView": SensorView,
+    "GroundTruth": GroundTruth,
+    "SensorData": SensorData,
+}
+
+# Abbreviation of the message type in the trace file name, see
+# detect_message_type in osi_general_validator
+TYPE_ABBREVIATIONS = {
+    "SensorView": "sv",
+    "GroundTruth": "gt",
+    "SensorData": "sd",
+}
+
+# Share of the generated values which do not comply with usual rules, so that
+# the validation also logs messages
+INVALID_RATE = 0.01
+
+# Time between two frames in nanoseconds
+FRAME_PERIOD = 100000000
+
+
+def command_line_arguments():
+    """Define and handle command line interface"""
+
+    parser = argparse.ArgumentParser(
+        description="Generate deterministic synthetic OSI traces.",
+        prog="python3 benchmarks/osi_trace_generator.py",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        help="Directory where the trace files are written.",
+        default=".",
+        type=str,
+    )
+    parser.add_argument(
+        "--type",
+        "-t",
+        help="Message types of the generated traces.",
+        nargs="+",
+        choices=list(MESSAGE_TYPES),
+        default=list(MESSAGE_TYPES),
+    )
+    add_trace_arguments(parser)
+
+    return parser.parse_args()
+
+
+def add_trace_arguments(parser):
+    """Add the arguments describing the content of the generated traces"""
+    parser.add_argument(
+        "--frames", help="Number of messages of a trace.", default=100, type=int
+    )
+    parser.add_argument(
+        "--objects", help="Number of moving objects per frame.", default=50, type=int
+    )
+    parser.add_argument(
+        "--lanes", help="Number of lanes per frame.", default=4, type=int
+    )
+    parser.add_argument(
+        "--points",
+        help="Number of points of each lane boundary.",
+        default=100,
+        type=int,
+    )
+    parser.add_argument(
+        "--seed", help="Seed of the generated values.", default=0, type=int
+    )
+
+
+def get_trace_name(data_type, frames, objects, lanes, points):
+    """Return the file name of a generated trace. The message type can be
+    detected from it."""
+    return (
+        f"synthetic_{TYPE_ABBREVIATIONS[data_type]}_"
+        f"{frames}_{objects}_{lanes}_{points}.osi"
+    )
+
+
+def fill_ground_truth(ground_truth, rng, frame, objects, lanes, points):
+    """Fill a ground truth message with the moving objects and lanes of a
+    frame"""
+    ground_truth.version.version_major = 3
+    ground_truth.timestamp.seconds = frame * FRAME_PERIOD // 1000000000
+    ground_truth.timestamp.nanos = frame * FRAME_PERIOD % 1000000000
+    ground_truth.host_vehicle_id.value = 0
+
+    for index in range(objects):
+        moving_object = ground_truth.moving_object.add()
+        moving_object.id.value = index
+        moving_object.type = 2 if index % 4 else 3
+        base = moving_object.base
+        base.dimension.length = 4.5 if rng.random() > INVALID_RATE else -1.0
+        base.dimension.width = 1.8
+        base.dimension.height = 1.5
+        base.position.x = 10.0 * index + frame * 3.0
+        base.position.y = 3.5 * (index % max(lanes, 1))
+        base.orientation.yaw = rng.uniform(-math.pi, math.pi)
+        base.velocity.x = 30.0
+        base.acceleration.x = rng.uniform(-1.0, 1.0)
+        moving_object.assigned_lane_id.add().value = 1000 + index % max(lanes, 1)
+        if moving_object.type == 2:
+            moving_object.vehicle_attributes.radius_wheel = 0.3
+
+    # The lanes are delimited by lanes + 1 boundaries
+    for index in range(lanes):
+        ground_truth.lane.add().id.value = 1000 + index
+    for index in range(lanes + 1 if lanes else 0):
+        lane_boundary = ground_truth.lane_boundary.add()
+        lane_boundary.id.value = 2000 + index
+        for point in range(points):
+            boundary_point = lane_boundary.boundary_line.add()
+            boundary_point.position.x = 2.0 * point
+            boundary_point.position.y = 3.5 * index - 1.75
+            boundary_point.width = 0.13 if rng.random() > INVALID_RATE else -0.1
+            boundary_point.height = 0.0
+
+
+def generate_message(data_type, rng, frame, objects, lanes, points):
+    """Return the message of a frame of a trace of type data_type"""
+    if data_type == "GroundTruth":
+        message = GroundTruth()
+        fill_ground_truth(message, rng, frame, objects, lanes, points)
+        return message
+
+    sensor_view = SensorView()
+    sensor_view.version.version_major = 3
+    sensor_view.sensor_id.value = 100
+    sensor_view.host_vehicle_id.value = 0
+    sensor_view.mounting_position.position.z = 1.5
+    fill_ground_truth(
+        sensor_view.global_ground_truth, rng, frame, objects, lanes, points
+    )
+    sensor_view.timestamp.CopyFrom(sensor_view.global_ground_truth.timestamp)
+    if data_type == "SensorView":
+        return sensor_view
+
+    sensor_data = SensorData()
+    sensor_data.version.version_major = 3
+    sensor_data.sensor_id.value = 100
+    sensor_data.timestamp.CopyFrom(sensor_view.timestamp)
+    sensor_data.sensor_view.add().CopyFrom(sensor_view)
+    return sensor_data
+
+
+def write_trace(path, data_type, frames, objects, lanes, points, seed=0):
+    """Write a synthetic trace of messages of type data_type. The same
+    parameters always produce the same trace."""
+    rng = random.Random(seed)
+    with open(path, "wb") as trace_file:
+        for frame in range(frames):
+            message = generate_message(data_type, rng, frame, objects, lanes, points)
+            data = message.SerializeToString()
+            trace_file.write(struct.pack("<L", len(data)))
+            trace_file.write(data)
+
+
+def main():
+    """Main method"""
+    args = command_line_arguments()
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+
+    for data_type in args.type:
+        path = os.path.join(
+            args.output,
+            get_trace_name(
+                data_type, args.frames, args.objects, args.lanes, args.points
+            ),
+        )
+        write_trace(
+            path,
+            data_type,
+            args.frames,
+            args.objects,
+            args.lanes,
+            args.points,
+            args.seed,
+        )
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ This class describes a wrapper on protobuf fields that add a link
 with parent message and bind message to some additional information.
 """
 
+from collections.abc import Sequence
+
 from google.protobuf.message import Message
 from google.protobuf.json_format import MessageToDict
 
@@ -18,21 +20,48 @@ class LinkedProtoField:
     with parent message and bind message to some additional information.
 
     The Protobuf's RepeatedCompositeContainer that describes repeated field are
-    replaced with Python lists.
+    replaced with LinkedProtoFieldLists.
     The field information (parent message and field name) for the repeated
     field are here bounded to each element of the list.
+
+    The path of the field is only built when it is needed, e.g. to log a
+    failure.
     """
 
+    __slots__ = (
+        "name",
+        "value",
+        "parent",
+        "_path",
+        "_dict",
+        "_fields",
+        "_message_type",
+    )
+
     def __init__(self, value, name=None, parent=None):
         self.name = name
         self.value = value
         self.parent = parent
-        self.path = name if parent is None else parent.path + "." + name
 
+        self._path = None
         self._dict = None
         self._fields = None
         self._message_type = None
 
+    @property
+    def path(self):
+        """Return the dotted path of the field from the root message"""
+        if self._path is None:
+            if self.parent is None:
+                self._path = self.name
+            else:
+                self._path = self.parent.path + "." + self.name
+        return self._path
+
+    @path.setter
+    def path(self, path):
+        self._path = path
+
     @property
     def is_message(self):
         """Return true if the field contain a message"""
@@ -44,12 +73,9 @@ class LinkedProtoField:
         Return a path to the message type in OSI3 as a ProtoMessagePath
         """
         if not self._message_type:
-            field_type_desc = self.value.DESCRIPTOR
-            message_type = []
-            while field_type_desc is not None:
-                message_type.insert(0, field_type_desc.name)
-                field_type_desc = field_type_desc.containing_type
-            self._message_type = osi_rules.ProtoMessagePath(message_type)
+            self._message_type = osi_rules.ProtoMessagePath.from_descriptor(
+                self.value.DESCRIPTOR
+            )
         return self._message_type
 
     @property
@@ -100,10 +126,7 @@ class LinkedProtoField:
             hasattr(self.value, "DESCRIPTOR")
             and self.value.DESCRIPTOR.fields_by_name[field_name].label == 3
         ):
-            return [
-                LinkedProtoField(u_field, parent=self, name=field_name)
-                for u_field in field
-            ]
+            return LinkedProtoFieldList(field, parent=self, name=field_name)
 
         return LinkedProtoField(field, parent=self, name=field_name)
 
@@ -128,14 +151,15 @@ class LinkedProtoField:
         Return a LinkedProtoField from a path.
 
         Example of path: ./global_ground_truth/moving_object
+
+        The path can also be given already split into its components, see
+        ``osi_rules.parse_query``.
         """
         cursor = self
-        components = path.split(".")
-        if parent:
-            if len(components) > 1:
-                components.pop()
-            else:
-                components.append("parent")
+        if isinstance(path, str):
+            components = osi_rules.parse_query(path, parent)
+        else:
+            components = path
 
         for path_component in components:
             if path_component == "this":
@@ -149,3 +173,35 @@ class LinkedProtoField:
 
     def __repr__(self):
         return self.value.__repr__()
+
+
+class LinkedProtoFieldList(Sequence):
+    """
+    View on a repeated field of a message. Its elements are wrapped into
+    LinkedProtoFields only when they are accessed.
+    """
+
+    __slots__ = ("values", "parent", "name")
+
+    def __init__(self, values, parent, name):
+        self.values = values
+        self.parent = parent
+        self.name = name
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [
+                LinkedProtoField(value, parent=self.parent, name=self.name)
+                for value in self.values[index]
+            ]
+        return LinkedProtoField(self.values[index], parent=self.parent, name=self.name)
+
+    def __iter__(self):
+        for value in self.values:
+            yield LinkedProtoField(value, parent=self.parent, name=self.name)
+
+    def __repr__(self):
+        return self.values.__repr__()
@@ -0,0 +1,254 @@
+"""
+This module validates several OSI trace files in one run, e.g. a directory of
+scenario traces. The rules are loaded once and the traces are distributed over
+a pool of worker processes. The error and warning logs and a summary are
+written for each trace, and a summary for the whole run.
+"""
+
+import glob
+from multiprocessing import Pool
+from tabulate import tabulate
+from tqdm import tqdm
+from osi3trace.osi_trace import OSITrace
+import os, sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+
+import osi_trace_index
+import osi_trace_reader
+import osi_validator
+import osi_validator_logger
+
+# Validator of the traces of a process, set by init_worker
+VALIDATOR = None
+
+
+def find_traces(paths):
+    """Return the trace files of a list of paths. A path is a trace file, a
+    directory whose trace files are validated or a glob pattern, e.g.
+    ``traces/**/*.osi``. The trace files of a directory are the files whose
+    name contains ".osi", e.g. trace_sv_.osi or trace_sv_.osi.xz, except the
+    trace indices."""
+    trace_paths = []
+    for path in paths:
+        if glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+        else:
+            matches = [path]
+
+        for match in matches:
+            if os.path.isdir(match):
+                trace_paths.extend(
+                    os.path.join(match, name)
+                    for name in sorted(os.listdir(match))
+                    if ".osi" in name
+                    and not name.endswith(osi_trace_index.INDEX_EXTENSION)
+                    and os.path.isfile(os.path.join(match, name))
+                )
+            else:
+                trace_paths.append(match)
+
+    # Each trace is validated once
+    return list(dict.fromkeys(trace_paths))
+
+
+def get_trace_name(path, used_names):
+    """Return the name of the log and summary files of a trace, unique among
+    the names already used"""
+    name = trace_name = os.path.basename(path)
+    count = 1
+    while trace_name in used_names:
+        count += 1
+        trace_name = f"{name}_{count}"
+    used_names.add(trace_name)
+    return trace_name
+
+
+class OSITraceSummary:
+    """Result of the validation of a trace file"""
+
+    def __init__(self, path, data_type):
+        self.path = path
+        self.data_type = data_type
+        self.messages = 0
+        # Messages logged over the trace, see OSILogAggregator
+        self.logs = osi_validator_logger.OSILogAggregator()
+        # Errors raised while validating messages of the trace
+        self.failures = []
+
+    @property
+    def is_valid(self):
+        """True if no message was logged and no error was raised"""
+        return not self.logs and not self.failures
+
+    def write(self, path):
+        """Write the summary into a file"""
+        with open(path, "w", encoding="utf-8") as summary_file:
+            summary_file.write(
+                f"Trace: {self.path}\n"
+                f"Type: {self.data_type}\n"
+                f"Messages: {self.messages}\n\n"
+            )
+            summary_file.write(
+                osi_validator_logger.format_synthesis(
+                    "Warnings", osi_validator_logger.get_synthesis_table(self.logs)
+                )
+                + "\n"
+            )
+            for failure in self.failures:
+                summary_file.write(f"Failure: {failure}\n")
+
+
+def init_worker(rules_path, rules_cache, incremental):
+    """Load the rules of the process validating the traces. The workers
+    forked from the main process inherit its validator."""
+    global VALIDATOR
+    if VALIDATOR is None:
+        VALIDATOR = osi_validator.OSIValidator(rules_path, rules_cache, incremental)
+
+
+def validate_trace(task):
+    """Validate a trace file, given as an (index, path, data type, maximum
+    number of messages or None, maximum number of errors or 0, buffer size,
+    output directory, trace name) task. The logged messages are written into
+    the error_<trace name>.log and warn_<trace name>.log files of the output
+    directory. Return the index and the OSITraceSummary of the trace."""
+    (
+        index,
+        path,
+        data_type,
+        max_messages,
+        max_errors,
+        buffer_size,
+        directory,
+        name,
+    ) = task
+    summary = OSITraceSummary(path, data_type)
+    # Each trace starts a new trace for the rules over time
+    VALIDATOR.reset()
+
+    try:
+        trace = osi_trace_reader.OSITraceReader(
+            path, OSITrace.map_message_type(data_type), buffer_size
+        )
+    except Exception as e:
+        summary.failures.append(str(e))
+        return index, summary
+
+    error_file = open(
+        os.path.join(directory, f"error_{name}.log"), "w", encoding="utf-8"
+    )
+    warning_file = open(
+        os.path.join(directory, f"warn_{name}.log"), "w", encoding="utf-8"
+    )
+    try:
+        for message in trace:
+            if max_messages and summary.messages >= max_messages:
+                break
+            summary.messages += 1
+            try:
+                log_messages = VALIDATOR.validate(message).log_messages
+            except Exception as e:
+                summary.failures.append(str(e))
+                # Logged but not aggregated, as in the validation of a trace
+                osi_validator_logger.write_log_messages(
+                    getattr(e, "log_messages", []), error_file, warning_file
+                )
+            else:
+                summary.logs.extend(log_messages)
+                osi_validator_logger.write_log_messages(
+                    log_messages, error_file, warning_file
+                )
+            if 0 < max_errors <= summary.logs.error_count:
+                break
+    except Exception as e:
+        summary.failures.append(str(e))
+    finally:
+        trace.close()
+        error_file.close()
+        warning_file.close()
+
+    return index, summary
+
+
+def write_summary(summaries, path):
+    """Print and write the summary of all the traces"""
+    headers = [
+        "Trace",
+        "Type",
+        "Messages",
+        "Logged messages",
+        "Distinct messages",
+        "Failures",
+    ]
+    rows = [
+        [
+            summary.path,
+            summary.data_type,
+            summary.messages,
+            len(summary.logs),
+            len(summary.logs.messages()),
+            len(summary.failures),
+        ]
+        for summary in summaries
+    ]
+    invalid = sum(not summary.is_valid for summary in summaries)
+    summary_string = (
+        tabulate(rows, headers=headers)
+        + f"\n\n{len(summaries)} traces, {invalid} with logged messages or failures"
+    )
+    print(summary_string)
+    with open(path, "w", encoding="utf-8") as summary_file:
+        summary_file.write(summary_string + "\n")
+
+
+def validate_traces(args, traces):
+    """Validate the (path, data type) traces of the command line arguments
+    and write their summaries. Return the summaries in the order of the
+    traces."""
+    directory = args.output
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # The worker processes are forked with the loaded rules
+    init_worker(args.rules, args.rules_cache, args.incremental)
+
+    max_messages = args.timesteps if args.timesteps != -1 else None
+    used_names = set()
+    names = [get_trace_name(path, used_names) for path, _ in traces]
+    tasks = [
+        (
+            index,
+            path,
+            data_type,
+            max_messages,
+            args.max_errors,
+            args.buffer,
+            directory,
+            names[index],
+        )
+        for index, (path, data_type) in enumerate(traces)
+    ]
+
+    summaries = [None] * len(tasks)
+    with tqdm(total=len(tasks), unit="trace") as pbar:
+        if args.parallel > 1:
+            with Pool(
+                args.parallel,
+                initializer=init_worker,
+                initargs=(args.rules, args.rules_cache, args.incremental),
+            ) as pool:
+                results = pool.imap_unordered(validate_trace, tasks)
+                for index, summary in results:
+                    summaries[index] = summary
+                    pbar.update(1)
+        else:
+            for task in tasks:
+                index, summary = validate_trace(task)
+                summaries[index] = summary
+                pbar.update(1)
+
+    for name, summary in zip(names, summaries):
+        summary.write(os.path.join(directory, f"summary_{name}.log"))
+    write_summary(summaries, os.path.join(directory, "summary.log"))
+    return summaries
@@ -3,6 +3,8 @@ Main class and entry point of the OSI Validator.
 """
 
 import argparse
+from itertools import islice
+from multiprocessing import Pool
 from tqdm import tqdm
 from osi3trace.osi_trace import OSITrace
 import os, sys
@@ -14,7 +16,13 @@ try:
     import osi_rules
     import osi_validator_logger
     import osi_rules_checker
-    import linked_proto_field
+    import osi_trace_index
+    import osi_trace_reader
+    import osi_trace_columns
+    import osi_rules_profiler
+    import osi_validator
+    import osi_validation_server
+    import osi_batch_validator
 except Exception as e:
     print(
         "Make sure you have installed the requirements with 'pip install -r requirements.txt'!"
@@ -29,19 +37,54 @@ def check_positive_int(value):
     return ivalue
 
 
+def check_strictly_positive_int(value):
+    ivalue = int(value)
+    if ivalue < 1:
+        raise argparse.ArgumentTypeError(
+            "%s is an invalid strictly positive int value" % value
+        )
+    return ivalue
+
+
 def command_line_arguments():
     """Define and handle command line interface"""
 
     dir_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 
     parser = argparse.ArgumentParser(
-        description="Validate data defined at the input", prog="osivalidator"
+        description="Validate data defined at the input",
+        prog="osivalidator",
+        fromfile_prefix_chars="@",
     )
     parser.add_argument(
         "--data",
-        help="Path to the file with OSI-serialized data.",
+        help="Path to the file with OSI-serialized data. Compressed files (gzip, "
+        "xz or zstd) are decompressed while they are read. Several files, "
+        "directories, glob patterns or @FILE lists of paths (one per line) can "
+        "be given: the rules are loaded once, the files are validated in "
+        "parallel with --parallel, the logs and a summary are written per file "
+        "and a summary for all the files.",
+        nargs="+",
         type=str,
-        required=True,
+        required=False,
+    )
+    parser.add_argument(
+        "--serve",
+        help="Instead of validating a file, validate the length-prefixed "
+        "messages sent to the socket at ADDRESS, HOST:PORT for TCP or "
+        "unix:PATH for a Unix socket, and send back a JSON verdict per message.",
+        metavar="ADDRESS",
+        type=str,
+        required=False,
+    )
+    parser.add_argument(
+        "--max-pending",
+        help="Maximum number of messages of a connection being validated in "
+        "server mode. The server stops reading the messages of the connection "
+        "when it is reached. At least 1.",
+        default=osi_validation_server.MAX_PENDING,
+        type=check_strictly_positive_int,
+        required=False,
     )
     parser.add_argument(
         "--rules",
@@ -50,6 +93,21 @@ def command_line_arguments():
         default=os.path.join(dir_path, "rules"),
         type=str,
     )
+    parser.add_argument(
+        "--rules-cache",
+        help="Path of the cache of the validated rules, which is used as long "
+        "as the rule files do not change. Default is a file per rules directory "
+        "in the cache directory of the user ($XDG_CACHE_HOME/osivalidator or "
+        "~/.cache/osivalidator).",
+        default=None,
+        type=str,
+        required=False,
+    )
+    parser.add_argument(
+        "--no-rules-cache",
+        help="Always validate and collect the rules from the rule files.",
+        action="store_true",
+    )
     parser.add_argument(
         "--type",
         "-t",
@@ -84,19 +142,138 @@ def command_line_arguments():
         default=-1,
         required=False,
     )
+    parser.add_argument(
+        "--from-timestep",
+        help="Index of the first timestep to analyze. The trace index stored "
+        "next to the trace file is used to seek directly to it.",
+        type=check_positive_int,
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--to-timestep",
+        help="Index of the last timestep to analyze (included). The trace "
+        "index stored next to the trace file is used to seek directly to it.",
+        type=check_positive_int,
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--timestamp-range",
+        help="Analyze only the messages whose timestamp (in seconds) is within "
+        "START and END (included). The trace index stored next to the trace "
+        "file is used to seek directly to them.",
+        nargs=2,
+        metavar=("START", "END"),
+        type=float,
+        default=None,
+        required=False,
+    )
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument(
+        "--sample-every",
+        help="Validate only every K-th message of the trace for a quick "
+        "triage. The trace index is used to seek directly to the sampled "
+        "messages and the failure rate of each logged message is estimated "
+        "with a confidence interval.",
+        metavar="K",
+        type=check_positive_int,
+        default=None,
+        required=False,
+    )
+    sampling.add_argument(
+        "--sample-count",
+        help="Validate only N messages of the trace drawn at random with "
+        "--sample-seed, see --sample-every.",
+        metavar="N",
+        type=check_positive_int,
+        default=None,
+        required=False,
+    )
+    sampling.add_argument(
+        "--sample-interval",
+        help="Validate only the first message of each interval of SECONDS of "
+        "timestamps, see --sample-every.",
+        metavar="SECONDS",
+        type=float,
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--sample-seed",
+        help="Seed of the random sample of --sample-count, so that the same "
+        "messages are sampled in each run.",
+        type=int,
+        default=0,
+        required=False,
+    )
     parser.add_argument(
         "--debug", help="Set the debug mode to ON.", action="store_true"
     )
     parser.add_argument(
         "--verbose", "-v", help="Set the verbose mode to ON.", action="store_true"
     )
+    parser.add_argument(
+        "--fail-fast",
+        help="Stop the validation after the first message with an error, e.g. to "
+        "only check if a trace is valid. All the errors of this message are "
+        "output.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max-errors",
+        help="Stop the validation after the message in which the given number of "
+        "errors is reached. All the errors of this message are output, so there "
+        "can be more errors than the limit. If 0, the whole trace is validated.",
+        default=0,
+        type=check_positive_int,
+        required=False,
+    )
+    parser.add_argument(
+        "--incremental",
+        help="Reuse the verdicts of the rules which only depend on an element of "
+        "a repeated field, e.g. on a lane, for the identical elements of the next "
+        "message. Static map content is then checked once instead of in every "
+        "message. Rules on IDs are still checked in every message.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--columnar",
+        help="Check the comparison rules on numbers, e.g. is_less_than, on "
+        "columns of the whole trace instead of one message at a time. The "
+        "compared fields are extracted once into NumPy files next to the trace "
+        "file and reused by the next runs, e.g. with other thresholds. The "
+        "windows and samples of timesteps select the checked rows. The other "
+        "rules are not checked and only the synthesis is output.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--read-ahead",
+        help="Number of messages read ahead of the validation by a background "
+        "thread, so that reading the trace overlaps with the validation, e.g. "
+        "on network file systems. If 0, the messages are read when they are "
+        "validated.",
+        default=0,
+        type=check_positive_int,
+        required=False,
+    )
+    parser.add_argument(
+        "--profile",
+        help="Profile the rules and write the time spent in each rule per "
+        "(type, field, verb) into a file next to the log files. The validation "
+        "runs in serial mode.",
+        action="store_true",
+    )
     parser.add_argument(
         "--parallel",
         "-p",
-        help="(Ignored) Set parallel mode to ON.",
-        default=False,
+        help="Set parallel mode to ON with the given number of worker processes. "
+        "If no number is given, one worker process per CPU core is used.",
+        nargs="?",
+        const=os.cpu_count(),
+        default=0,
+        type=check_positive_int,
         required=False,
-        action="store_true",
     )
     parser.add_argument(
         "--format",
@@ -110,7 +287,7 @@ def command_line_arguments():
     parser.add_argument(
         "--blast",
         "-bl",
-        help="Set the maximum in-memory storage count of OSI messages during validation.",
+        help="(Ignored) Set the maximum in-memory storage count of OSI messages during validation.",
         default=500,
         type=check_positive_int,
         required=False,
@@ -118,18 +295,38 @@ def command_line_arguments():
     parser.add_argument(
         "--buffer",
         "-bu",
-        help="(Ignored) Set the buffer size to retrieve OSI messages from trace file. Set it to 0 if you do not want to use buffering at all.",
+        help="Set the buffer size to retrieve OSI messages from trace file. Set it to 0 to memory-map the trace file and parse the messages without copying them.",
         default=0,
         type=check_positive_int,
         required=False,
     )
 
-    return parser.parse_args()
-
-
-LOGS = []
+    args = parser.parse_args()
+    if args.data is None and args.serve is None:
+        parser.error("one of the arguments --data --serve is required")
+    if args.sample_interval is not None and args.sample_interval <= 0:
+        parser.error("argument --sample-interval: must be positive")
+    if args.fail_fast:
+        args.max_errors = 1
+    if args.no_rules_cache:
+        args.rules_cache = None
+    elif args.rules_cache is None:
+        args.rules_cache = osi_rules.get_rules_cache_path(args.rules)
+    return args
+
+
+# Aggregated messages of the validated timesteps
+LOGS = osi_validator_logger.OSILogAggregator()
 LOGGER = osi_validator_logger.OSIValidatorLogger()
 VALIDATION_RULES = osi_rules.OSIRules()
+RULE_CHECKER = osi_rules_checker.OSIRulesChecker(LOGGER)
+
+# Number of messages sent at once to a worker process in parallel mode
+PARALLEL_CHUNK_SIZE = 16
+
+# State of a worker process in parallel mode, set by init_worker
+WORKER_TRACE_READER = None
+WORKER_DATA_TYPE = None
 
 
 def detect_message_type(path: str):
@@ -172,6 +369,19 @@ def main():
     # Handling of command line arguments
     args = command_line_arguments()
 
+    if args.serve is not None:
+        osi_validation_server.serve(args)
+        return
+
+    trace_paths = osi_batch_validator.find_traces(args.data)
+    if not trace_paths:
+        print("No trace file found in", " ".join(args.data))
+        exit(1)
+    if len(trace_paths) > 1:
+        validate_traces(args, trace_paths)
+        return
+    args.data = trace_paths[0]
+
     if not args.type:
         args.type = detect_message_type(args.data)
 
@@ -185,17 +395,42 @@ def main():
 
     # Read data
     print("Reading data ...")
-    trace = OSITrace(path=args.data, type_name=args.type)
+    message_type = OSITrace.map_message_type(args.type)
+    trace = osi_trace_reader.OSITraceReader(args.data, message_type, args.buffer)
 
     # Collect Validation Rules
     print("Collect validation rules ...")
     try:
-        VALIDATION_RULES.from_yaml_directory(args.rules)
+        VALIDATION_RULES.from_yaml_directory(args.rules, args.rules_cache)
     except Exception as e:
         trace.close()
         print("Error collecting validation rules:", e)
         exit(1)
 
+    if args.columnar and (
+        args.parallel > 1
+        or args.max_errors
+        or args.incremental
+        or args.read_ahead
+        or args.profile
+    ):
+        print(
+            "--parallel, --fail-fast, --max-errors, --incremental, --read-ahead "
+            "and --profile are ignored with --columnar"
+        )
+        args.max_errors = 0
+        args.profile = False
+
+    RULE_CHECKER.incremental = args.incremental
+
+    profiler = None
+    if args.profile:
+        if args.parallel > 1:
+            print("Profiling runs in serial mode")
+            args.parallel = 0
+        profiler = osi_rules_profiler.OSIRulesProfiler()
+        profiler.attach(RULE_CHECKER)
+
     # Pass all timesteps or the number specified
     if args.timesteps != -1:
         max_timestep = args.timesteps
@@ -207,43 +442,324 @@ def main():
     total_length = os.path.getsize(args.data)
     current_pos = 0
 
-    with tqdm(total=total_length, unit="B", unit_scale=True, unit_divisor=1024) as pbar:
-        for index, message in enumerate(trace):
-            if index % args.blast == 0:
-                LOGS = []
-            if max_timestep and index >= max_timestep:
-                pbar.update(total_length - current_pos)
-                break
-            try:
-                process_message(message, index, args.type)
-            except Exception as e:
-                print(str(e))
-            new_pos = trace.file.tell()
-            pbar.update(new_pos - current_pos)
-            current_pos = new_pos
+    # Use the trace index to seek directly to a window of the trace
+    trace_index = None
+    if (
+        args.from_timestep is not None
+        or args.to_timestep is not None
+        or args.timestamp_range is not None
+        or is_sampled(args)
+    ):
+        print("Indexing trace ...")
+        trace_index = osi_trace_index.OSITraceIndex.load_or_build(
+            args.data, message_type
+        )
+        message_indices = trace_index.select(
+            args.from_timestep, args.to_timestep, args.timestamp_range
+        )
+        if is_sampled(args):
+            message_indices = trace_index.sample(
+                message_indices,
+                args.sample_every,
+                args.sample_count,
+                args.sample_seed,
+                args.sample_interval,
+            )
+            LOGGER.info(None, f"Sample {len(message_indices)} messages")
+        if max_timestep:
+            message_indices = message_indices[:max_timestep]
+        if trace.compression is None:
+            total_length = sum(
+                trace_index.sizes[index] + osi_trace_index.HEADER_SIZE
+                for index in message_indices
+            )
+
+    if args.columnar:
+        # The columns of the whole trace are extracted, the window and the
+        # sample only select the checked rows
+        if trace_index is not None:
+            validate_columnar(args, trace, message_indices)
+        elif max_timestep:
+            validate_columnar(args, trace, range(max_timestep))
+        else:
+            validate_columnar(args, trace)
+    else:
+        with tqdm(
+            total=total_length, unit="B", unit_scale=True, unit_divisor=1024
+        ) as pbar:
+            if args.parallel > 1 or args.read_ahead or trace.compression is not None:
+                if trace_index is not None:
+                    message_ranges = (
+                        (index, trace_index.offsets[index], trace_index.sizes[index])
+                        for index in message_indices
+                    )
+                elif trace.compression is not None:
+                    # The messages are found while the trace is decompressed
+                    message_ranges = None
+                else:
+                    message_ranges = (
+                        (index, offset, size)
+                        for index, (offset, size) in enumerate(
+                            osi_trace_index.get_message_ranges(args.data)
+                        )
+                    )
+                    if max_timestep:
+                        message_ranges = islice(message_ranges, max_timestep)
+
+                if args.parallel > 1 and trace.compression is None:
+                    validate_parallel(args, process_message_range, message_ranges, pbar)
+                else:
+                    # Compressed traces are decompressed once, in the main process
+                    serialized_messages = osi_trace_reader.read_serialized_messages(
+                        args.data, message_ranges
+                    )
+                    if message_ranges is None and max_timestep:
+                        serialized_messages = islice(serialized_messages, max_timestep)
+                    if args.read_ahead:
+                        serialized_messages = osi_trace_reader.read_ahead(
+                            serialized_messages, args.read_ahead
+                        )
+                    if args.parallel > 1:
+                        validate_parallel(
+                            args, process_serialized_message, serialized_messages, pbar
+                        )
+                    else:
+                        validate_serialized(
+                            args, message_type, serialized_messages, pbar
+                        )
+            elif trace_index is not None:
+                for index in message_indices:
+                    message = trace.read_message(
+                        trace_index.offsets[index], trace_index.sizes[index]
+                    )
+                    try:
+                        LOGS.extend(process_message(message, index, args.type))
+                    except Exception as e:
+                        print(str(e))
+                    pbar.update(trace_index.sizes[index] + osi_trace_index.HEADER_SIZE)
+                    if is_max_errors_reached(args):
+                        break
+            else:
+                for index, message in enumerate(trace):
+                    if max_timestep and index >= max_timestep:
+                        pbar.update(total_length - current_pos)
+                        break
+                    try:
+                        LOGS.extend(process_message(message, index, args.type))
+                    except Exception as e:
+                        print(str(e))
+                    new_pos = trace.position
+                    pbar.update(new_pos - current_pos)
+                    current_pos = new_pos
+                    if is_max_errors_reached(args):
+                        break
 
     trace.close()
+    if is_max_errors_reached(args):
+        if args.fail_fast:
+            print(
+                "Validation stopped at the first invalid message (timestep "
+                f"{LOGS.first_error_timestamp}, {LOGS.error_count} errors)"
+            )
+        else:
+            print(
+                f"Validation stopped after {LOGS.error_count} errors "
+                f"(--max-errors {args.max_errors})"
+            )
+    if profiler is not None:
+        profile_path = os.path.join(directory, f"profile_{LOGGER.files_timestamp}.log")
+        profiler.write(profile_path)
+        print(f"Rules profile written to {profile_path}")
     display_results()
+    if is_sampled(args):
+        if is_max_errors_reached(args):
+            print("The failure rates are not estimated as the validation stopped")
+        else:
+            osi_validator_logger.print_failure_rates(LOGS, len(message_indices))
     if get_num_logs() > 0:
         exit(1)
 
 
+def validate_traces(args, trace_paths):
+    """Validate several trace files, see osi_batch_validator"""
+    if (
+        args.from_timestep is not None
+        or args.to_timestep is not None
+        or args.timestamp_range is not None
+        or args.profile
+        or args.read_ahead
+        or args.columnar
+        or is_sampled(args)
+    ):
+        print(
+            "--from-timestep, --to-timestep, --timestamp-range, --profile, "
+            "--read-ahead, --columnar and the sampling options are ignored when "
+            "several traces are validated"
+        )
+
+    print("Collect validation rules ...")
+    try:
+        osi_batch_validator.init_worker(args.rules, args.rules_cache, args.incremental)
+    except Exception as e:
+        print("Error collecting validation rules:", e)
+        exit(1)
+
+    traces = [(path, args.type or detect_message_type(path)) for path in trace_paths]
+    summaries = osi_batch_validator.validate_traces(args, traces)
+    if not all(summary.is_valid for summary in summaries):
+        exit(1)
+
+
+def validate_columnar(args, trace, timesteps=None):
+    """Check the comparison rules on the columns of the whole trace, or only
+    on the rows of the given timesteps, see osi_trace_columns"""
+    descriptor = trace.message_type.DESCRIPTOR
+    comparisons = osi_trace_columns.get_comparisons(
+        VALIDATION_RULES.compile(descriptor.name, descriptor)
+    )
+    print(f"Check {len(comparisons)} rules on the columns of the trace ...")
+    with tqdm(
+        total=os.path.getsize(args.data),
+        unit="B",
+        unit_scale=True,
+        unit_divisor=1024,
+    ) as pbar:
+        columns = osi_trace_columns.OSITraceColumns.load_or_extract(
+            args.data, trace, comparisons, pbar
+        )
+        pbar.update(pbar.total - pbar.n)
+    columns.check(comparisons, LOGS, timesteps)
+
+
 def process_message(message, timestep, data_type):
-    """Process one message"""
-    rule_checker = osi_rules_checker.OSIRulesChecker(LOGGER)
-    timestamp = rule_checker.set_timestamp(message.timestamp, timestep)
+    """Process one message. Return the messages logged for it."""
+    return osi_validator.process_message(
+        RULE_CHECKER, VALIDATION_RULES, message, timestep, data_type
+    )
+
 
-    LOGGER.log_messages[timestep] = []
-    LOGGER.debug_messages[timestep] = []
-    LOGGER.info(None, f"Analyze message of timestamp {timestamp}", False)
+def init_worker(
+    path, data_type, rules_path, rules_cache, debug, buffer_size, incremental
+):
+    """Initialize a worker process of the parallel validation"""
+    global WORKER_TRACE_READER, WORKER_DATA_TYPE
 
-    # Check common rules
-    getattr(rule_checker, "check_children")(
-        linked_proto_field.LinkedProtoField(message, name=data_type),
-        VALIDATION_RULES.get_rules().get_type(data_type),
+    # The main process logs the collected messages and tracks the IDs over
+    # the trace in the order of the trace
+    LOGGER.init_collect_only(debug)
+    RULE_CHECKER.id_tracker = None
+    RULE_CHECKER.incremental = incremental
+
+    # Rules are inherited from the main process if the worker is forked
+    if not VALIDATION_RULES.get_rules().nested_types:
+        VALIDATION_RULES.from_yaml_directory(rules_path, rules_cache)
+
+    WORKER_TRACE_READER = osi_trace_reader.OSITraceReader(
+        path, OSITrace.map_message_type(data_type), buffer_size
     )
+    WORKER_DATA_TYPE = data_type
+
+
+def process_message_range(message_range):
+    """Decode and process the message at the given byte range of the trace in
+    a worker process. Return the index of the message, the number of bytes of
+    the trace it spans, the collected log messages, the observed IDs to track
+    over the trace and the error raised during processing, if any."""
+    index, offset, size = message_range
+    message = WORKER_TRACE_READER.read_message(offset, size)
+    return process_worker_message(index, size + osi_trace_index.HEADER_SIZE, message)
+
+
+def process_serialized_message(serialized_message):
+    """Decode and process a serialized message read by the main process (see
+    ``osi_trace_reader.read_serialized_messages``) in a worker process. Return
+    the same results as process_message_range."""
+    index, progress, data = serialized_message
+    message = WORKER_TRACE_READER.message_type.FromString(data)
+    return process_worker_message(index, progress, message)
+
 
-    LOGS.extend(LOGGER.log_messages[timestep])
+def process_worker_message(index, progress, message):
+    """Process a message in a worker process, see process_message_range"""
+    error = None
+    try:
+        log_messages = process_message(message, index, WORKER_DATA_TYPE)
+        id_observations = RULE_CHECKER.pop_id_observations()
+    except Exception as e:
+        error = str(e)
+        # The main process logs the messages logged before the error, as in a
+        # serial validation, but does not track the IDs of the message
+        log_messages = getattr(e, "log_messages", [])
+        id_observations = []
+
+    # Logs are aggregated in the main process only
+    return index, progress, log_messages, id_observations, error
+
+
+def validate_parallel(args, process, tasks, pbar):
+    """Validate the messages of the trace in a pool of worker processes. The
+    tasks are given to the process function in the worker processes, e.g. the
+    (index, offset, size) ranges of the messages to process_message_range.
+
+    The results are merged in the order of the trace so that logs and
+    synthesis are the same as the ones of a serial validation.
+    """
+    with Pool(
+        args.parallel,
+        initializer=init_worker,
+        initargs=(
+            args.data,
+            args.type,
+            args.rules,
+            args.rules_cache,
+            args.debug,
+            args.buffer,
+            args.incremental,
+        ),
+    ) as pool:
+        for index, progress, log_messages, id_observations, error in pool.imap(
+            process, tasks, chunksize=PARALLEL_CHUNK_SIZE
+        ):
+            LOGGER.replay(log_messages)
+            RULE_CHECKER.track_id_observations(index, id_observations)
+            log_messages = LOGGER.log_messages.pop(index, [])
+            if error is None:
+                LOGS.extend(log_messages)
+            else:
+                print(error)
+            pbar.update(progress)
+            if is_max_errors_reached(args):
+                # The pending messages are dropped when the pool terminates
+                return
+
+    pbar.update(pbar.total - pbar.n)
+
+
+def validate_serialized(args, message_type, serialized_messages, pbar):
+    """Decode and validate the serialized messages of the trace, see
+    ``osi_trace_reader.read_serialized_messages``"""
+    for index, progress, data in serialized_messages:
+        try:
+            message = message_type.FromString(data)
+            LOGS.extend(process_message(message, index, args.type))
+        except Exception as e:
+            print(str(e))
+        pbar.update(progress)
+        if is_max_errors_reached(args):
+            return
+
+    pbar.update(pbar.total - pbar.n)
+
+
+def is_max_errors_reached(args):
+    """Check if the validation has to stop because --max-errors errors are
+    logged"""
+    return 0 < args.max_errors <= LOGS.error_count
+
+
+def is_sampled(args):
+    """Check if only a sample of the messages of the trace is validated"""
+    return bool(args.sample_every or args.sample_count or args.sample_interval)
 
 
 # Synthetize Logs
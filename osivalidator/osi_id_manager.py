@@ -3,6 +3,7 @@ This module contains the OSIIDManager which manage IDs and check for references
 and unicity according to the OSI KPIs.
 """
 
+from array import array
 from collections import Counter
 
 
@@ -16,6 +17,14 @@ class OSIIDManager:
         # to be resolved at the end
         self._index = dict()
 
+        # (id, type name) => first object of this type with this id
+        # Used to resolve the references with one lookup
+        self._typed_index = dict()
+
+        # id => True if several objects of the same type have the id
+        # Only the ids of several objects, to check the unicity
+        self._duplicated_ids = dict()
+
         # [(referer_obj, id, expected_type, condition), ...]
         # one tuple per reference
         # to be resolved at the end
@@ -37,8 +46,16 @@ class OSIIDManager:
 
     def register_message(self, message_id, message):
         """Register one message in the ID manager"""
+        typed_key = (message_id, type(message).__name__)
+        same_type = typed_key in self._typed_index
+        if not same_type:
+            self._typed_index[typed_key] = message
+
         if message_id in self._index:
             self._index[message_id].append(message)
+            self._duplicated_ids[message_id] = same_type or self._duplicated_ids.get(
+                message_id, False
+            )
         else:
             self._index[message_id] = [message]
         return True
@@ -52,25 +69,27 @@ class OSIIDManager:
 
     def resolve_unicity(self, timestamp):
         """Check for double ID"""
+        if not self._duplicated_ids:
+            return
+
+        # Report the IDs in the order of their first registration
         for identifier, objects in self._index.items():
-            types_counter = None
-            if len(objects) > 1:
-                types_list = list(map(type, objects))
-                types_str_list = ", ".join(map(lambda o: o.__name__, types_list))
+            if identifier in self._duplicated_ids:
+                types_list = [type(o).__name__ for o in objects]
+                types_str_list = ", ".join(types_list)
                 self.logger.warning(
                     timestamp,
                     f"Several objects of type {types_str_list} have the ID "
                     + str(identifier),
                 )
 
-                if len(objects) != len(set(types_list)):
-                    types_counter = list(map(str, Counter(list(types_list))))
+                if self._duplicated_ids[identifier]:
+                    types_counter = Counter(types_list)
 
                     obj_list_str = ", ".join(
-                        map(
-                            lambda t, c=types_counter: c[t] + " " + t.__name__,
-                            filter(lambda t, c=types_counter: c[t] != 1, types_counter),
-                        )
+                        str(count) + " " + type_name
+                        for type_name, count in types_counter.items()
+                        if count != 1
                     )
 
                     self.logger.error(
@@ -85,14 +104,8 @@ class OSIIDManager:
         """Check if references are compliant"""
         for reference in self._references:
             referer, identifier, expected_type, condition = reference
-            try:
-                found_object = next(
-                    filter(
-                        lambda o, et=expected_type: type(o).__name__ == et,
-                        self._index[identifier],
-                    )
-                )
-            except (StopIteration, KeyError):
+            found_object = self._typed_index.get((identifier, expected_type))
+            if found_object is None:
                 self.logger.error(
                     timestamp,
                     f"Reference unresolved: {referer.DESCRIPTOR.name} "
@@ -113,9 +126,70 @@ class OSIIDManager:
     def reset(self):
         """Erase all data in the ID manager"""
         self._index = {}
+        self._typed_index = {}
+        self._duplicated_ids = {}
         self._references = []
 
 
+class OSIIDTracker:
+    """Track the IDs over the timesteps of a whole trace.
+
+    Only a compact state is kept per ID (last timestep and type of the
+    object), without reference to the messages, so that the memory does not
+    grow with the length of the trace.
+    """
+
+    def __init__(self):
+        # id => row in the state columns
+        self._rows = dict()
+
+        # type name => type code
+        self._type_codes = dict()
+
+        # State columns, one row per id
+        self.last_timesteps = array("q")
+        self.types = array("l")
+
+        self.timestep = self.previous_timestep = -1
+
+    def __len__(self):
+        return len(self._rows)
+
+    def start_timestep(self, timestep):
+        """Set the timestep of the next tracked IDs. Timesteps have to be
+        started in the order of the trace."""
+        if timestep != self.timestep:
+            self.previous_timestep = self.timestep
+            self.timestep = timestep
+
+    def track(self, identifier, type_name):
+        """Track an object of type type_name with the ID in the current
+        timestep.
+
+        Return False if the ID was used by an object of another type before,
+        or if the ID reappears after it was missing in the previous processed
+        timestep.
+        """
+        type_code = self._type_codes.get(type_name)
+        if type_code is None:
+            type_code = self._type_codes[type_name] = len(self._type_codes)
+
+        row = self._rows.get(identifier)
+        if row is None:
+            self._rows[identifier] = len(self.last_timesteps)
+            self.last_timesteps.append(self.timestep)
+            self.types.append(type_code)
+            return True
+
+        last_timestep = self.last_timesteps[row]
+        reappeared = (
+            last_timestep != self.timestep and last_timestep < self.previous_timestep
+        )
+        self.last_timesteps[row] = self.timestep
+
+        return self.types[row] == type_code and not reappeared
+
+
 def message_t_filter(message, message_t):
     """Check if a message is of type message_t"""
     if message_t is not None:
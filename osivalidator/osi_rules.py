@@ -7,6 +7,9 @@ import os, sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "."))
 
+import hashlib
+import importlib.metadata
+import pickle
 from copy import deepcopy
 from enum import Enum
 
@@ -15,6 +18,14 @@ from pathlib import Path
 import yamale
 
 import osi_rules_implementations
+import osi_vectorized_rules
+
+# Directory of the rules cache files of the user, in the user cache directory
+RULES_CACHE_DIRECTORY = "osivalidator"
+RULES_CACHE_MAGIC = b"OSIRULES03"
+# Name of the installed distribution, whose version is part of the digest of
+# the rules cache files
+DISTRIBUTION_NAME = "OSI-Validation"
 
 
 class OSIRules:
@@ -22,6 +33,7 @@ class OSIRules:
 
     def __init__(self):
         self.rules = TypeRulesContainer()
+        self.plans = dict()
         self.nested_fields = {
             "dimension",
             "position",
@@ -36,9 +48,7 @@ class OSIRules:
         """Validate rule yml files against schema."""
 
         # Read schema file
-        directory = os.path.dirname(file)
-        filename, file_extension = os.path.splitext(os.path.basename(file))
-        schema_file = directory + os.sep + "schema" + os.sep + filename + "_schema.yml"
+        schema_file = get_schema_path(file)
         if os.path.exists(schema_file):
             schema = yamale.make_schema(schema_file)
         else:
@@ -57,27 +67,53 @@ class OSIRules:
 
         return True
 
-    def from_yaml_directory(self, path=None):
-        """Collect validation rules found in the directory."""
+    def from_yaml_directory(self, path=None, cache_path=None):
+        """Collect validation rules found in the directory.
+
+        If a cache_path is given and no rules were collected yet, the rules
+        are loaded from this cache file as long as the rule files and their
+        schemas do not change. Otherwise the rule files are validated and
+        collected, and the cache file is updated.
+        """
 
         if not path:
             dir_path = dir_path = os.path.dirname(os.path.realpath(__file__))
             path = os.path.join(dir_path, "rules")
 
         exts = (".yml", ".yaml")
+        filenames = [
+            filename
+            for filename in os.listdir(path)
+            if filename.startswith("osi_") and filename.endswith(exts)
+        ]
+
+        if cache_path is not None and not self.rules.nested_types:
+            digest = get_rules_digest(path, filenames)
+            rules = load_rules_cache(cache_path, digest)
+            if rules is not None:
+                self.rules = rules
+                return
+        else:
+            cache_path = None
+
         rule_file_errors = dict()
-        for filename in os.listdir(path):
-            if filename.startswith("osi_") and filename.endswith(exts):
-                if self.validate_rules_yml(os.path.join(path, filename)):
-                    self.from_yaml_file(os.path.join(path, filename))
-                else:
-                    print(f"WARNING: Invalid rule file: {filename}.\n")
-                    rule_file_errors[filename] = rule_file_errors.get(filename, 0) + 1
+        for filename in filenames:
+            if self.validate_rules_yml(os.path.join(path, filename)):
+                self.from_yaml_file(os.path.join(path, filename))
+            else:
+                print(f"WARNING: Invalid rule file: {filename}.\n")
+                rule_file_errors[filename] = rule_file_errors.get(filename, 0) + 1
 
         if rule_file_errors:
             print(f"Errors per file: {rule_file_errors}")
             raise Exception("Errors were found in the OSI rule files.")
 
+        if cache_path is not None:
+            try:
+                save_rules_cache(cache_path, digest, self.rules)
+            except OSError as e:
+                print(f"WARNING: Could not save the rules cache {cache_path}: {e}")
+
     def from_yaml_file(self, path):
         """Import from a file"""
         yaml = YAML(typ="safe")
@@ -92,6 +128,95 @@ class OSIRules:
         """Return the rules"""
         return self.rules
 
+    def compile(self, type_name, descriptor):
+        """Compile the rules of the message type ``type_name`` into an
+        execution plan for messages with the protobuf descriptor ``descriptor``.
+
+        The plan resolves once what the check_children rule resolves for each
+        message: the rules of the nested message types, the default
+        check_children rules of the message fields and the rule implementations.
+        Plans are cached, so compiling the same type again is cheap.
+        """
+        plans_count = len(self.plans)
+        plan = self._compile_type(
+            self.rules.get_type(type_name), descriptor, type_name, None
+        )
+        if len(self.plans) != plans_count:
+            prune_plans(self.plans.values())
+            osi_vectorized_rules.vectorize_plans(self.plans.values())
+            localize_plans(self.plans.values())
+        return plan
+
+    def _compile_type(self, type_rules, descriptor, name, nested_rules):
+        """Compile the plan of a message type found in a field ``name``.
+
+        ``nested_rules`` are the rules of the special type (see ``type_match``
+        in osi_rules_implementations) whose nested types overwrite the rules of
+        the subfields of the message.
+        """
+        key = (id(type_rules), descriptor.full_name, name, id(nested_rules))
+        if key in self.plans:
+            return self.plans[key]
+
+        plan = MessageTypePlan(type_rules)
+        # Registered before compiling the steps because types can be recursive
+        self.plans[key] = plan
+
+        type_rules.add_default_rules(descriptor)
+
+        for field_name, field_rules in type_rules.fields.items():
+            field_descriptor = descriptor.fields_by_name.get(field_name)
+
+            for rule in field_rules.rules.values():
+                if rule.verb == "is_optional":
+                    # Always complies and has no side effect
+                    continue
+
+                child_plan = None
+                if (
+                    rule.verb == "check_children"
+                    and field_descriptor is not None
+                    and field_descriptor.message_type
+                ):
+                    child_plan = self._compile_subfield(
+                        field_descriptor, name, nested_rules
+                    )
+
+                step = RuleStep(rule, field_descriptor, child_plan)
+                if getattr(step.implementation, "compound", False):
+                    # Build the nested rules once, before checking messages
+                    rule.get_nested_rules()
+                plan.steps.append(step)
+
+        return plan
+
+    def _compile_subfield(self, field_descriptor, parent_name, nested_rules):
+        """Compile the plan of a message field, or return None if there are no
+        rules for its type."""
+        field_name = field_descriptor.name
+        descriptor = field_descriptor.message_type
+
+        if nested_rules is not None and field_name in nested_rules.nested_types:
+            type_rules = nested_rules.nested_types[field_name]
+        else:
+            try:
+                type_rules = self.rules.get_type(
+                    ProtoMessagePath.from_descriptor(descriptor)
+                )
+            except KeyError:
+                # The check_children rule raises the error when it is checked
+                return None
+
+        special_type = osi_rules_implementations.type_match.get(
+            parent_name + "." + field_name
+        )
+        return self._compile_type(
+            type_rules,
+            descriptor,
+            field_name,
+            self.rules.nested_types.get(special_type),
+        )
+
     def from_dict(self, rules_dict=None, rules_container=None):
         """Translate dict rules into objects rules"""
 
@@ -122,6 +247,84 @@ class OSIRules:
                 )
 
 
+def get_schema_path(path):
+    """Return the path of the schema file of a rule file"""
+    directory = os.path.dirname(path)
+    filename, _ = os.path.splitext(os.path.basename(path))
+    return os.path.join(directory, "schema", filename + "_schema.yml")
+
+
+def get_rules_cache_path(path):
+    """Return the default path of the rules cache file of a rules directory:
+    a file per rules directory in the cache directory of the user
+    ($XDG_CACHE_HOME/osivalidator or ~/.cache/osivalidator)"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    name = hashlib.sha256(os.path.realpath(path).encode()).hexdigest()[:16]
+    return os.path.join(cache_home, RULES_CACHE_DIRECTORY, f"rules_{name}.cache")
+
+
+def get_package_version():
+    """Return the version of the installed osivalidator, an empty string if it
+    is not installed"""
+    try:
+        return importlib.metadata.version(DISTRIBUTION_NAME)
+    except importlib.metadata.PackageNotFoundError:
+        return ""
+
+
+def get_rules_digest(path, filenames):
+    """Return the hash of the content of the rule files of a directory and of
+    their schema files. The version of the package and the code of this
+    module are included, so that the rule trees pickled by another version of
+    the classes of the rule tree are not loaded."""
+    digest = hashlib.sha256(__name__.encode())
+    digest.update(get_package_version().encode() + b"\0")
+    digest.update(Path(__file__).read_bytes())
+    for filename in sorted(filenames):
+        digest.update(filename.encode() + b"\0")
+        for file_path in (
+            os.path.join(path, filename),
+            get_schema_path(os.path.join(path, filename)),
+        ):
+            try:
+                digest.update(Path(file_path).read_bytes())
+            except FileNotFoundError:
+                pass
+            digest.update(b"\0")
+    return digest.digest()
+
+
+def load_rules_cache(cache_path, digest):
+    """Read the rule tree of a rules cache file. Return None if it does not
+    exist or if it was not saved for rule files with this digest."""
+    try:
+        with open(cache_path, "rb") as cache_file:
+            header = cache_file.read(len(RULES_CACHE_MAGIC) + len(digest))
+            if header != RULES_CACHE_MAGIC + digest:
+                return None
+            return pickle.load(cache_file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def save_rules_cache(cache_path, digest, rules):
+    """Write the rule tree collected from rule files with this digest into a
+    rules cache file"""
+    directory = os.path.dirname(cache_path)
+    if directory:
+        # The cache is unpickled, so only the user can write into the default
+        # cache directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    temporary_path = cache_path + "." + str(os.getpid())
+    with open(temporary_path, "wb") as cache_file:
+        cache_file.write(RULES_CACHE_MAGIC + digest)
+        pickle.dump(rules, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+    # Parallel runs never read a partially written cache
+    os.replace(temporary_path, cache_path)
+
+
 class ProtoMessagePath:
     """Represents a path to a message object"""
 
@@ -130,6 +333,16 @@ class ProtoMessagePath:
             sys.stderr.write("Path must be str list, found " + str(path) + "\n")
         self.path = deepcopy(path) or []
 
+    @classmethod
+    def from_descriptor(cls, descriptor):
+        """Return the path of the (nested) message type of a protobuf
+        descriptor"""
+        path = []
+        while descriptor is not None:
+            path.insert(0, descriptor.name)
+            descriptor = descriptor.containing_type
+        return cls(path)
+
     def __repr__(self):
         return ".".join(self.path)
 
@@ -248,6 +461,7 @@ class MessageTypeRules(TypeRulesContainer):
         super().__init__(root=root)
         self.type_name = name
         self.fields = dict()
+        self.default_rules_descriptors = set()
         if isinstance(fields, list):
             for field in fields:
                 self.fields[field.field_name] = field
@@ -261,6 +475,28 @@ class MessageTypeRules(TypeRulesContainer):
         self.fields[field.field_name] = field
         return field
 
+    def add_default_rules(self, descriptor):
+        """Add the default rules for the fields of a protobuf descriptor of this
+        Message Type, that is a check_children rule for each message field.
+
+        The default rules only depend on the descriptor, so they are derived
+        only the first time a descriptor is seen.
+        """
+        if descriptor.full_name in self.default_rules_descriptors:
+            return
+
+        for field_descriptor in descriptor.fields:
+            field_rules = self.fields.get(field_descriptor.name) or self.add_field(
+                FieldRules(field_descriptor.name)
+            )
+
+            if field_descriptor.message_type and not field_rules.has_rule(
+                "check_children"
+            ):
+                field_rules.add_rule(Rule(verb="check_children"))
+
+        self.default_rules_descriptors.add(descriptor.full_name)
+
     def get_field(self, field_name):
         return self.fields[field_name]
 
@@ -373,20 +609,55 @@ class Rule(OSIRuleNode):
     def path(self):
         return self._path
 
+    @property
+    def target(self):
+        return self._target
+
+    @target.setter
+    def target(self, target):
+        # The target is parsed once, when the rule is loaded
+        self._target = target
+        if target:
+            self.target_query = parse_query(target, parent=True)
+            self._targeted_field = target.split(".")[-1]
+        else:
+            self.target_query = None
+            self._targeted_field = None
+
     @property
     def targeted_field(self):
-        if self.target:
-            return self.target.split(".")[-1]
+        if self._targeted_field is not None:
+            return self._targeted_field
         return self.field_name
 
     @path.setter
     def path(self, path):
         self._path = path
+        self._description = None
+        self._nested_rules = None
         if len(self.path.path) >= 2 and isinstance(self.path, ProtoMessagePath):
             self.field_name = self.path.path[-2]
         elif not hasattr(self, "field_name"):
             self.field_name = "UnknownField"
 
+    @property
+    def description(self):
+        """Return the text describing the rule in the log messages, e.g.
+        ``MovingObject.type.is_less_than_or_equal_to(4)``. It is built the
+        first time a field does not comply with the rule."""
+        if self._description is None:
+            self._description = str(self.path) + "(" + str(self.params) + ")"
+        return self._description
+
+    def get_nested_rules(self):
+        """Return the rules nested in the parameters of a compound rule, e.g.
+        the statements of check_if, see
+        ``osi_rules_implementations.build_nested_rules``. They are built the
+        first time and reused for each checked field."""
+        if self._nested_rules is None:
+            self._nested_rules = osi_rules_implementations.build_nested_rules(self)
+        return self._nested_rules
+
     def __repr__(self):
         return f"{self.verb}({self.params}) target={self.target}"
 
@@ -398,6 +669,156 @@ class Rule(OSIRuleNode):
         )
 
 
+def parse_query(path, parent=False):
+    """Split a query path (see ``LinkedProtoField.query``) into its components.
+    If parent is True, the path is changed to query the parent of the field."""
+    components = path.split(".")
+    if parent:
+        if len(components) > 1:
+            components.pop()
+        else:
+            components.append("parent")
+    return tuple(components)
+
+
+class MessageTypePlan:
+    """Execution plan of the rules of a message type, see ``OSIRules.compile``"""
+
+    def __init__(self, type_rules):
+        self.type_rules = type_rules
+        self.steps = []
+        # If all the steps or if at least one step only depend on the checked
+        # message, see localize_plans
+        self.is_local = False
+        self.has_local_steps = False
+
+    def __repr__(self):
+        return f"{self.type_rules.type_name}:Plan({len(self.steps)}):{self.steps}"
+
+
+class RuleStep:
+    """One rule of an execution plan with everything needed to check it
+    resolved in advance"""
+
+    __slots__ = (
+        "rule",
+        "implementation",
+        "field_name",
+        "target",
+        "pre_check",
+        "field_descriptor",
+        "child_plan",
+        "vectorized",
+        "is_local",
+    )
+
+    def __init__(self, rule, field_descriptor=None, child_plan=None):
+        self.rule = rule
+        self.implementation = getattr(osi_rules_implementations, rule.verb, None)
+        self.field_name = rule.targeted_field
+        self.target = rule.target_query
+        self.pre_check = getattr(self.implementation, "pre_check", False)
+        self.field_descriptor = field_descriptor
+        self.child_plan = child_plan
+        # Check on columns of the children of a repeated field, see
+        # osi_vectorized_rules
+        self.vectorized = None
+        # True if the step only depends on the checked message, see
+        # localize_plans
+        self.is_local = False
+
+    def __repr__(self):
+        return repr(self.rule)
+
+
+def prune_plans(plans):
+    """Remove the check of the subfields of messages whose plan has no step,
+    as they cannot fail."""
+    changed = True
+    while changed:
+        changed = False
+        for plan in plans:
+            steps = [
+                step
+                for step in plan.steps
+                if step.child_plan is None or step.child_plan.steps
+            ]
+            if len(steps) != len(plan.steps):
+                plan.steps = steps
+                changed = True
+
+
+def is_local_query(components):
+    """Check if a query (see ``parse_query``) stays within the queried message
+    and its subfields"""
+    depth = 0
+    for component in components:
+        if component == "parent":
+            depth -= 1
+            if depth < 0:
+                return False
+        elif component != "this":
+            depth += 1
+    return True
+
+
+def is_local_params(params):
+    """Check if the rules nested in the parameters of a rule, e.g. the
+    statements of check_if, only depend on the checked message"""
+    if isinstance(params, dict):
+        for key, value in params.items():
+            if getattr(
+                getattr(osi_rules_implementations, key, None), "non_local", False
+            ):
+                return False
+            if key == "target" and not (
+                isinstance(value, str) and is_local_query(parse_query(value, True))
+            ):
+                return False
+            if not is_local_params(value):
+                return False
+    elif isinstance(params, list):
+        return all(is_local_params(value) for value in params)
+    return True
+
+
+def is_local_step(step):
+    """Check if a step of an execution plan only depends on the checked
+    message, given the locality of the plans of its subfields"""
+    if step.child_plan is not None:
+        return step.child_plan.is_local
+    rule = step.rule
+    return (
+        step.implementation is not None
+        and not getattr(step.implementation, "non_local", False)
+        and (step.target is None or is_local_query(step.target))
+        and is_local_params(rule.params)
+        and is_local_params(rule.extra_params)
+    )
+
+
+def localize_plans(plans):
+    """Mark the steps and plans which only depend on the checked message, so
+    that their verdicts on a message can be reused for identical messages (see
+    ``OSIRulesChecker.incremental``). Rules on IDs and rules targeting fields
+    outside of the message are not local."""
+    plans = list(plans)
+    for plan in plans:
+        plan.is_local = True
+    changed = True
+    while changed:
+        changed = False
+        for plan in plans:
+            if plan.is_local and not all(is_local_step(step) for step in plan.steps):
+                plan.is_local = False
+                changed = True
+
+    for plan in plans:
+        for step in plan.steps:
+            step.is_local = is_local_step(step)
+        plan.has_local_steps = any(step.is_local for step in plan.steps)
+
+
 class Severity(Enum):
     """Description of the severity of the raised error if a rule does not comply."""
 
@@ -12,6 +12,7 @@ import osi_rules
 import osi_validator_logger
 import osi_id_manager
 import osi_rules_implementations
+import osi_vectorized_rules
 
 
 class OSIRulesChecker:
@@ -26,6 +27,25 @@ class OSIRulesChecker:
         self.id_manager = osi_id_manager.OSIIDManager(logger)
         self.timestamp = self.timestamp_ns = -1
 
+        # Trace-wide state of the IDs for the is_stable_over_time rule. If it
+        # is None, the observed IDs are collected with pop_id_observations
+        # and tracked by another checker, e.g. in parallel mode.
+        self.id_tracker = osi_id_manager.OSIIDTracker()
+        # [(id, type name, rule, field), ...] of the current timestep
+        self.id_observations = []
+
+        # If True, the verdicts of the local steps (see osi_rules.localize_plans)
+        # on the elements of repeated fields are reused for identical elements
+        # of the next message, e.g. for the static lanes of a ground truth
+        self.incremental = False
+        # (plan, path, serialized element) => verdicts of the steps of the
+        # plan on the elements of the previous and current messages, see
+        # check_cached_plan
+        self.verdicts = dict()
+        self.next_verdicts = dict()
+        # Messages logged while checking a step whose verdict is cached
+        self.recorded_logs = None
+
         for module_name in dir(osi_rules_implementations):
             method = getattr(osi_rules_implementations, module_name)
             if getattr(method, "is_rule", False):
@@ -43,14 +63,68 @@ class OSIRulesChecker:
         else:
             raise TypeError("type not accepted: must be Severity enum or str")
 
+        if self.recorded_logs is not None:
+            self.recorded_logs.append((severity, message))
+
         return getattr(self.logger, severity_method)(self.timestamp, message)
 
+    def reset(self):
+        """Reset the state related to one timestep (ID index, references and
+        timestamp), so that the checker can be reused for the next message"""
+        self.id_manager.reset()
+        self.id_observations = []
+        self.timestamp = self.timestamp_ns = -1
+        # Only the verdicts of the previous message are kept
+        self.verdicts = self.next_verdicts
+        self.next_verdicts = dict()
+
     def set_timestamp(self, timestamp, ts_id):
         """Set the timestamp for the analysis"""
         self.timestamp_ns = int(timestamp.nanos + timestamp.seconds * 10e9)
         self.timestamp = ts_id
+        if self.id_tracker is not None:
+            self.id_tracker.start_timestep(ts_id)
         return self.timestamp, ts_id
 
+    def resolve_id_observations(self):
+        """Track the IDs observed in the current timestep over the trace and
+        log the ones which are not stable"""
+        if self.id_tracker is None:
+            return
+        for identifier, type_name, rule, field in self.id_observations:
+            if not self.id_tracker.track(identifier, type_name):
+                self.log(
+                    rule.severity,
+                    osi_rules_implementations.get_failure_message(rule, field.path),
+                )
+        self.id_observations = []
+
+    def pop_id_observations(self):
+        """Return the IDs observed in the current timestep as picklable
+        (id, type name, severity, failure message) tuples, see
+        track_id_observations"""
+        observations = [
+            (
+                identifier,
+                type_name,
+                rule.severity,
+                osi_rules_implementations.get_failure_message(rule, field.path),
+            )
+            for identifier, type_name, rule, field in self.id_observations
+        ]
+        self.id_observations = []
+        return observations
+
+    def track_id_observations(self, timestep, observations):
+        """Track the IDs observed by another checker (see pop_id_observations)
+        in a timestep. Timesteps have to be tracked in the order of the
+        trace."""
+        self.timestamp = timestep
+        self.id_tracker.start_timestep(timestep)
+        for identifier, type_name, severity, message in observations:
+            if not self.id_tracker.track(identifier, type_name):
+                self.log(severity, message)
+
     def check_rule(self, parent_field, rule):
         """Check if a field comply with a rule given the \*parent\* field"""
         try:
@@ -59,7 +133,7 @@ class OSIRulesChecker:
             raise AttributeError("Rule " + rule.verb + " not implemented yet\n")
 
         if rule.target is not None:
-            parent_field = parent_field.query(rule.target, parent=True)
+            parent_field = parent_field.query(rule.target_query)
 
         if getattr(rule_method, "pre_check", False):
             # We do NOT know if the child exists
@@ -74,3 +148,90 @@ class OSIRulesChecker:
             return rule_method(checked_field, rule)
 
         return False
+
+    def check_plan(self, field, plan):
+        """Check a message field with the execution plan of its type (see
+        ``OSIRules.compile``). This is the compiled equivalent of the
+        check_children rule."""
+        for step in plan.steps:
+            self.check_step(field, step)
+
+        # Resolve ID and references
+        if not field.parent:
+            self.id_manager.resolve_unicity(self.timestamp)
+            self.id_manager.resolve_references(self.timestamp)
+            self.resolve_id_observations()
+        return True
+
+    def check_step(self, parent_field, step):
+        """Check a step of an execution plan given the *parent* field"""
+        if step.implementation is None:
+            return self.check_rule(parent_field, step.rule)
+
+        if step.target is not None:
+            parent_field = parent_field.query(step.target)
+
+        if step.vectorized is not None:
+            elements = getattr(parent_field.value, step.field_name)
+            if len(elements) >= osi_vectorized_rules.MIN_ELEMENTS:
+                return step.vectorized.check(self, parent_field, elements)
+
+        if step.pre_check:
+            checked_field = parent_field
+        elif parent_field.has_field(step.field_name):
+            checked_field = parent_field.get_field(step.field_name)
+        else:
+            return False
+
+        if step.child_plan is not None:
+            if not osi_rules_implementations.is_repeated(checked_field):
+                self.check_plan(checked_field, step.child_plan)
+            elif (
+                self.incremental
+                and step.child_plan.has_local_steps
+                and self.recorded_logs is None
+            ):
+                for unique_field in checked_field:
+                    self.check_cached_plan(unique_field, step.child_plan)
+            else:
+                for unique_field in checked_field:
+                    self.check_plan(unique_field, step.child_plan)
+            return True
+
+        return step.implementation(self, checked_field, step.rule)
+
+    def check_cached_plan(self, field, plan):
+        """Check an element of a repeated field with the plan of its type. The
+        messages logged by the local steps (see osi_rules.localize_plans) are
+        logged again for an identical element of the previous or current
+        message instead of checking these steps. The other steps, e.g. on IDs,
+        are always checked."""
+        key = (plan, field.path, field.value.SerializeToString())
+        verdict = self.next_verdicts.get(key)
+        if verdict is None:
+            verdict = self.verdicts.get(key)
+
+        if verdict is None:
+            # Logged messages of the local steps, None for the other steps
+            verdict = []
+            for step in plan.steps:
+                if not step.is_local:
+                    self.check_step(field, step)
+                    verdict.append(None)
+                    continue
+                self.recorded_logs = []
+                try:
+                    self.check_step(field, step)
+                    verdict.append(tuple(self.recorded_logs))
+                finally:
+                    self.recorded_logs = None
+            verdict = tuple(verdict)
+        else:
+            for step, logs in zip(plan.steps, verdict):
+                if logs is None:
+                    self.check_step(field, step)
+                    continue
+                for severity, message in logs:
+                    self.log(severity, message)
+
+        self.next_verdicts[key] = verdict
@@ -6,6 +6,7 @@ All these rules are bounded into "OSIRulesChecker", so they have access to all
 its attributes and methods.
 """
 
+from collections.abc import Sequence
 from functools import wraps
 from iso3166 import countries
 import os, sys
@@ -16,15 +17,48 @@ import osi_rules
 
 def add_default_rules_to_subfields(message, type_rules):
     """Add default rules to fields of message fields (subfields)"""
-    for descriptor in message.all_field_descriptors:
-        field_rules = (
-            type_rules.get_field(descriptor.name)
-            if descriptor.name in type_rules.fields
-            else type_rules.add_field(osi_rules.FieldRules(descriptor.name))
-        )
+    type_rules.add_default_rules(message.value.DESCRIPTOR)
+
+
+def is_repeated(field):
+    """Check if a field is a list of fields, e.g. the view on the elements of a
+    repeated field returned by ``LinkedProtoField.get_field``"""
+    return isinstance(field, Sequence) and not isinstance(field, str)
+
+
+def get_failure_message(rule, path):
+    """Return the message logged when the field at path does not comply with
+    the rule"""
+    return RuleFailure(rule.description, path)
+
+
+class RuleFailure:
+    """Message logged when a field does not comply with a rule.
+
+    Only the description of the rule and the path of the field are stored,
+    the text of the message is built when it is output. Two failures of the
+    same rule at the same path are equal, like their texts.
+    """
+
+    __slots__ = ("rule", "path")
+
+    def __init__(self, rule, path):
+        self.rule = rule
+        self.path = path
+
+    def __str__(self):
+        return self.rule + " does not comply in " + str(self.path)
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __eq__(self, other):
+        if not isinstance(other, RuleFailure):
+            return NotImplemented
+        return self.rule == other.rule and self.path == other.path
 
-        if descriptor.message_type:
-            field_rules.add_rule(osi_rules.Rule(verb="check_children"))
+    def __hash__(self):
+        return hash((self.rule, self.path))
 
 
 # DECORATORS
@@ -47,6 +81,20 @@ def repeated_selector(func):
     return func
 
 
+def non_local(func):
+    """Decorator for rules whose compliance depends on fields outside of the
+    checked message, e.g. on the other IDs of the timestep or of the trace"""
+    func.non_local = True
+    return func
+
+
+def compound(func):
+    """Decorator for rules whose parameters contain other rules, which are
+    built once, see ``build_nested_rules``"""
+    func.compound = True
+    return func
+
+
 def rule_implementation(func):
     """Decorator to label rules method implementations"""
     func.is_rule = True
@@ -56,31 +104,61 @@ def rule_implementation(func):
         if isinstance(rule, osi_rules.FieldRules):
             rule = rule.rules[func.__name__]
 
-        if isinstance(field, list) and not getattr(func, "repeated_selector", False):
+        if is_repeated(field) and not getattr(func, "repeated_selector", False):
             result = all([func(self, unique_field, rule) for unique_field in field])
         else:
             result = func(self, field, rule, **kwargs)
 
         if not result and isinstance(rule, osi_rules.Rule):
-            if isinstance(field, list):
+            if is_repeated(field):
                 path = field[0].path
             else:
                 path = field.path
-            self.log(
-                rule.severity,
-                str(rule.path)
-                + "("
-                + str(rule.params)
-                + ")"
-                + " does not comply in "
-                + str(path),
-            )
+            self.log(rule.severity, get_failure_message(rule, path))
 
         return result
 
     return wrapper
 
 
+def build_nested_rules(rule):
+    """Build the rules nested in the parameters of a compound rule: the
+    (statements, checks) of check_if, or the rules on the fields of the
+    element selected by first_element and last_element. Use
+    ``Rule.get_nested_rules`` to build them only once."""
+    if rule.verb == "check_if":
+        statements = []
+        for statement in rule.params:
+            statement_rule = osi_rules.Rule(
+                dictionary=statement,
+                field_name=rule.field_name,
+                severity=osi_rules.Severity.INFO,
+            )
+            statement_rule.path = rule.path.child_path(statement_rule.verb)
+            statements.append(statement_rule)
+        checks = tuple(
+            osi_rules.Rule(
+                path=rule.path.child_path(next(iter(check.keys()))),
+                dictionary=check,
+                field_name=rule.field_name,
+            )
+            for check in rule.extra_params["do_check"]
+        )
+        return tuple(statements), checks
+
+    # Only the first rule of each field is checked on the selected element
+    element_rules = []
+    for key_field, nested_rule in rule.params.items():
+        element_rule = osi_rules.Rule(
+            dictionary={**nested_rule[0], "target": "this." + key_field},
+            field_name=rule.field_name,
+            severity=osi_rules.Severity.ERROR,
+        )
+        element_rule.path = rule.path.child_path(element_rule.verb)
+        element_rules.append(element_rule)
+    return tuple(element_rules)
+
+
 # RULES
 # TODO Refactor this code into a seperate class so it can be easy parsed by sphinx
 
@@ -92,6 +170,7 @@ type_match = {
 
 
 @rule_implementation
+@non_local
 def check_children(self, field, rule):
     """Check if a field message is valid, that is all the inner rules of the
     message in the field are complying.
@@ -126,6 +205,7 @@ def check_children(self, field, rule):
     if not field.parent:
         self.id_manager.resolve_unicity(self.timestamp)
         self.id_manager.resolve_references(self.timestamp)
+        self.resolve_id_observations()
     return True
 
 
@@ -194,6 +274,7 @@ def is_different_to(self, field, rule):
 
 
 @rule_implementation
+@non_local
 def is_globally_unique(self, field, rule):
     """Register an ID in the OSI ID manager to later perform a ID
     consistency validation.
@@ -210,6 +291,26 @@ def is_globally_unique(self, field, rule):
 
 
 @rule_implementation
+@non_local
+def is_stable_over_time(self, field, rule):
+    """Check over the whole trace that an ID keeps designating an object of
+    the same type and that it does not reappear after it was missing in the
+    previous timestep.
+
+    Must be set to an Identifier. The ID is checked with the other IDs of the
+    timestep, once all the rules of the message are checked.
+
+    :param params: none
+    """
+    object_of_id = field.parent.value
+    identifier = field.value.value
+
+    self.id_observations.append((identifier, type(object_of_id).__name__, rule, field))
+    return True
+
+
+@rule_implementation
+@non_local
 def refers_to(self, field, rule):
     """Add a reference to another message by ID.
 
@@ -240,6 +341,7 @@ def is_iso_country_code(self, field, rule):
 
 @rule_implementation
 @repeated_selector
+@compound
 def first_element(self, field, rule):
     """Check rule for first message of a repeated field.
 
@@ -247,30 +349,14 @@ def first_element(self, field, rule):
                    (mapping)
     """
     statement_true = True
-    nested_fields_rules = rule.params
-
-    # Convert parsed yaml file to dictonary rules
-    nested_fields_rules_list = []
-    for key_field, nested_rule in nested_fields_rules.items():
-        nested_rule[0].update({"target": "this." + key_field})
-        nested_fields_rules_list.append(nested_rule[0])
-
-    rules_checker_list = []
-    for nested_fields_rule in nested_fields_rules_list:
-        statement_rule = osi_rules.Rule(
-            dictionary=nested_fields_rule,
-            field_name=rule.field_name,
-            severity=osi_rules.Severity.ERROR,
-        )
-        statement_rule.path = rule.path.child_path(statement_rule.verb)
-        statement_true = self.check_rule(field[0], statement_rule) and statement_true
-        rules_checker_list.append(statement_true)
-
-    return all(rules_checker_list)
+    for element_rule in rule.get_nested_rules():
+        statement_true = self.check_rule(field[0], element_rule) and statement_true
+    return statement_true
 
 
 @rule_implementation
 @repeated_selector
+@compound
 def last_element(self, field, rule):
     """Check rule for last message of a repeated field.
 
@@ -279,26 +365,9 @@ def last_element(self, field, rule):
                    (mapping)
     """
     statement_true = True
-    nested_fields_rules = rule.params
-
-    # Convert parsed yaml file to dictonary rules
-    nested_fields_rules_list = []
-    for key_field, nested_rule in nested_fields_rules.items():
-        nested_rule[0].update({"target": "this." + key_field})
-        nested_fields_rules_list.append(nested_rule[0])
-
-    rules_checker_list = []
-    for nested_fields_rule in nested_fields_rules_list:
-        statement_rule = osi_rules.Rule(
-            dictionary=nested_fields_rule,
-            field_name=rule.field_name,
-            severity=osi_rules.Severity.ERROR,
-        )
-        statement_rule.path = rule.path.child_path(statement_rule.verb)
-        statement_true = self.check_rule(field[-1], statement_rule) and statement_true
-        rules_checker_list.append(statement_true)
-
-    return all(rules_checker_list)
+    for element_rule in rule.get_nested_rules():
+        statement_true = self.check_rule(field[-1], element_rule) and statement_true
+    return statement_true
 
 
 @rule_implementation
@@ -322,6 +391,7 @@ def is_set(self, field, rule):
 
 @rule_implementation
 @pre_check
+@compound
 def check_if(self, field, rule):
     """
     Evaluate rules if some statements are verified:
@@ -350,34 +420,18 @@ def check_if(self, field, rule):
     - is_greater_than_or_equal_to: 0
 
     """
-    statements = rule.params
-    do_checks = rule.extra_params["do_check"]
+    statements, checks = rule.get_nested_rules()
     statement_true = True
 
     # Check if all the statements are true
-    for statement in statements:
-        statement_rule = osi_rules.Rule(
-            dictionary=statement,
-            field_name=rule.field_name,
-            severity=osi_rules.Severity.INFO,
-        )
-        statement_rule.path = rule.path.child_path(statement_rule.verb)
+    for statement_rule in statements:
         statement_true = self.check_rule(field, statement_rule) and statement_true
 
     # If the statements are true, check the do_check rules
     if not statement_true:
         return True
 
-    return all(
-        (
-            self.check_rule(
-                field,
-                osi_rules.Rule(
-                    path=rule.path.child_path(next(iter(check.keys()))),
-                    dictionary=check,
-                    field_name=rule.field_name,
-                ),
-            )
-            for check in do_checks
-        )
-    )
+    for check in checks:
+        if not self.check_rule(field, check):
+            return False
+    return True
@@ -0,0 +1,120 @@
+"""
+This module contains the OSIRulesProfiler which measures the time spent in the
+rules checked by an OSIRulesChecker.
+"""
+
+from time import perf_counter
+from tabulate import tabulate
+import os, sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+
+import osi_rules_implementations
+
+
+def get_profile_key(path):
+    """Return the (type, field, verb) of the components of a rule path, e.g.
+    ("MovingObject", "vehicle_attributes", "check_if.is_set") for
+    MovingObject.vehicle_attributes.check_if.is_set"""
+    for index, component in enumerate(path):
+        if index and getattr(
+            getattr(osi_rules_implementations, component, None), "is_rule", False
+        ):
+            return (
+                ".".join(path[: index - 1]),
+                path[index - 1],
+                ".".join(path[index:]),
+            )
+    return ".".join(path[:-1]), path[-1] if path else "", ""
+
+
+class OSIRulesProfiler:
+    """Call count, failure count (logged messages), total time (without the
+    rules checked within the rule) and cumulative time of the rules checked by
+    an OSIRulesChecker, per (type, field, verb).
+
+    The comparisons checked on columns (see osi_vectorized_rules) are
+    accounted to the check_children rule of their repeated field.
+    """
+
+    def __init__(self):
+        # (type, field, verb) => [calls, failures, total time, cumulative time]
+        self.stats = dict()
+        self._keys = dict()
+        # [time of the nested rules, logged messages] of the running rules
+        self._stack = []
+
+    def attach(self, checker):
+        """Profile the rules checked by a checker"""
+        check_rule = checker.check_rule
+        check_step = checker.check_step
+        log = checker.log
+
+        def profiled_check_rule(parent_field, rule):
+            return self.profile(rule, check_rule, parent_field, rule)
+
+        def profiled_check_step(parent_field, step):
+            if step.implementation is None:
+                # Profiled by check_rule
+                return check_step(parent_field, step)
+            return self.profile(step.rule, check_step, parent_field, step)
+
+        def profiled_log(severity, message):
+            if self._stack:
+                self._stack[-1][1] += 1
+            return log(severity, message)
+
+        checker.check_rule = profiled_check_rule
+        checker.check_step = profiled_check_step
+        checker.log = profiled_log
+
+    def profile(self, rule, check, *args):
+        """Check a rule with check(*args) and record its statistics"""
+        path = tuple(rule.path.path)
+        key = self._keys.get(path)
+        if key is None:
+            key = self._keys[path] = get_profile_key(path)
+
+        frame = [0.0, 0]
+        self._stack.append(frame)
+        start = perf_counter()
+        try:
+            return check(*args)
+        finally:
+            duration = perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += duration
+
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = [0, 0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += frame[1]
+            stats[2] += duration - frame[0]
+            stats[3] += duration
+
+    def get_table(self):
+        """Return the rows of the statistics sorted by decreasing total
+        time"""
+        return sorted(
+            (key + tuple(stats) for key, stats in self.stats.items()),
+            key=lambda row: row[5],
+            reverse=True,
+        )
+
+    def write(self, path):
+        """Write the hot-spot table into a file"""
+        headers = [
+            "Type",
+            "Field",
+            "Verb",
+            "Calls",
+            "Failures",
+            "Total time (s)",
+            "Cumulative time (s)",
+        ]
+        with open(path, "w", encoding="utf-8") as profile_file:
+            profile_file.write(
+                tabulate(self.get_table(), headers=headers, floatfmt=".6f") + "\n"
+            )
@@ -0,0 +1,349 @@
+"""
+This module contains the OSITraceColumns which flattens the scalar fields
+compared by the rules into one column per field over the whole OSI trace, so
+that the comparison rules are checked at once on each column instead of one
+message at a time.
+
+Each repeated message field is a table whose rows are its elements in all the
+messages of the trace, e.g. the moving objects of all the timesteps, with a
+column of the timestep of each row. The columns are stored as NumPy ``.npy``
+files next to the trace file, so that they are only extracted once for
+repeated runs, e.g. with different thresholds.
+"""
+
+import json
+import os
+import sys
+from array import array
+
+import numpy
+from google.protobuf.descriptor import FieldDescriptor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+
+import osi_rules
+import osi_rules_implementations
+import osi_vectorized_rules
+
+COLUMNS_EXTENSION = ".columns"
+MANIFEST_FILENAME = "columns.json"
+MANIFEST_VERSION = 1
+
+# Suffixes of the files of the timesteps of a table and of the fields set in
+# the rows of a column
+TIMESTEPS_SUFFIX = "#timestep"
+IS_SET_SUFFIX = "#set"
+
+# Type codes of the arrays gathering the values of each column type
+ARRAY_TYPECODES = {numpy.int64: "q", numpy.uint64: "Q", numpy.float64: "d"}
+
+
+class ColumnComparison:
+    """Comparison rule on a column: the rule compares the field at the chain
+    of field names of the rows of the table (the repeated field at the path
+    of field names from the root message, the root message itself if empty)"""
+
+    __slots__ = ("table", "chain", "rule", "column_type")
+
+    def __init__(self, table, chain, rule, column_type):
+        self.table = table
+        self.chain = chain
+        self.rule = rule
+        self.column_type = column_type
+
+    def get_path(self, type_name):
+        """Return the path of the compared field, as in the log messages"""
+        return ".".join((type_name,) + self.table + self.chain)
+
+
+def get_comparisons(plan, table=(), chain=(), plans=()):
+    """Return the ColumnComparisons of the comparison rules of an execution
+    plan (see ``OSIRules.compile``) and of the plans of its subfields which
+    can be checked on columns: the ones of ``osi_vectorized_rules`` on
+    scalar fields with a number as parameter. Rules whose failures are not
+    logged (INFO) are skipped."""
+    comparisons = []
+    plans = plans + (plan,)
+    for step in plan.steps:
+        field_descriptor = step.field_descriptor
+        if (
+            step.implementation is None
+            or step.target is not None
+            or field_descriptor is None
+        ):
+            continue
+
+        repeated = field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+        if step.child_plan is not None:
+            if step.child_plan in plans:
+                # Recursive message type
+                continue
+            if repeated:
+                comparisons.extend(
+                    get_comparisons(
+                        step.child_plan,
+                        table + chain + (step.field_name,),
+                        (),
+                        plans,
+                    )
+                )
+            else:
+                comparisons.extend(
+                    get_comparisons(
+                        step.child_plan, table, chain + (step.field_name,), plans
+                    )
+                )
+            continue
+
+        rule = step.rule
+        column_type = osi_vectorized_rules.COLUMN_TYPES.get(field_descriptor.cpp_type)
+        if (
+            repeated
+            or not field_descriptor.has_presence
+            or column_type is None
+            or rule.verb not in osi_vectorized_rules.COMPARISONS
+            or not isinstance(rule.params, (int, float))
+            or rule.severity == osi_rules.Severity.INFO
+        ):
+            continue
+        comparisons.append(
+            ColumnComparison(table, chain + (step.field_name,), rule, column_type)
+        )
+    return comparisons
+
+
+def get_rows(messages, table):
+    """Return the rows of a table in a message. ``messages`` maps the paths
+    already resolved in the message to their messages, starting with
+    ``{(): [message]}``."""
+    for length in range(1, len(table) + 1):
+        if table[:length] in messages:
+            continue
+        parents = messages[table[: length - 1]]
+        field_name = table[length - 1]
+        if not parents:
+            messages[table[:length]] = []
+        elif (
+            parents[0].DESCRIPTOR.fields_by_name[field_name].label
+            == FieldDescriptor.LABEL_REPEATED
+        ):
+            messages[table[:length]] = [
+                element for parent in parents for element in getattr(parent, field_name)
+            ]
+        else:
+            # The subfields of unset message fields are not checked
+            messages[table[:length]] = [
+                getattr(parent, field_name)
+                for parent in parents
+                if parent.HasField(field_name)
+            ]
+    return messages[table]
+
+
+def get_value(message, chain):
+    """Return the value of the field at the chain of field names of a message,
+    the default value if it is not set"""
+    for field_name in chain:
+        message = getattr(message, field_name)
+    return message
+
+
+class OSITraceColumns:
+    """Columns of the scalar fields of the messages of an OSI trace file,
+    stored in a directory next to the trace file (with the extension
+    ``.columns``) and extracted again when the trace file changes.
+
+    The columns are named after the paths of their fields, e.g.
+    ``SensorView.global_ground_truth.moving_object.type``. Each column has a
+    boolean column of the rows where the field is set (``<column>#set``) and
+    each table a column of the timesteps of its rows (``<table>#timestep``).
+    """
+
+    def __init__(self, directory, type_name):
+        self.directory = directory
+        self.type_name = type_name
+        # column name => NumPy array
+        self.columns = dict()
+
+    @staticmethod
+    def get_columns_path(path):
+        """Return the path of the columns directory of a trace file"""
+        return path + COLUMNS_EXTENSION
+
+    def get_table_name(self, table):
+        """Return the name of the timestep column of a table"""
+        return ".".join((self.type_name,) + table) + TIMESTEPS_SUFFIX
+
+    def get_column_names(self, comparison):
+        """Return the names of the value and set columns of a comparison"""
+        name = comparison.get_path(self.type_name)
+        return name, name + IS_SET_SUFFIX
+
+    @classmethod
+    def load_or_extract(cls, path, trace, comparisons, pbar=None):
+        """Return the columns of the trace file at path needed by the
+        comparisons. The stored columns are loaded if the trace file did not
+        change, the missing ones are extracted from the OSITraceReader trace
+        and stored."""
+        type_name = trace.message_type.DESCRIPTOR.name
+        columns = cls(cls.get_columns_path(path), type_name)
+        trace_stat = os.stat(path)
+
+        manifest = columns.load_manifest(trace_stat)
+        if manifest is None:
+            # The stored columns are outdated, they are extracted again
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "type": type_name,
+                "size": trace_stat.st_size,
+                "mtime": trace_stat.st_mtime_ns,
+                "columns": [],
+            }
+
+        stored = set(manifest["columns"])
+        missing = [
+            comparison
+            for comparison in comparisons
+            if not set(columns.get_column_names(comparison)) <= stored
+        ]
+        if missing:
+            columns.extract(trace, missing, stored, pbar)
+            try:
+                columns.save(manifest)
+            except OSError as e:
+                print(
+                    f"WARNING: Could not save the trace columns {columns.directory}: {e}"
+                )
+
+        for comparison in comparisons:
+            for name in columns.get_column_names(comparison) + (
+                columns.get_table_name(comparison.table),
+            ):
+                if name not in columns.columns:
+                    columns.columns[name] = numpy.load(
+                        os.path.join(columns.directory, name + ".npy")
+                    )
+        return columns
+
+    def load_manifest(self, trace_stat):
+        """Read the manifest of the stored columns. Return None if there is
+        none or if the trace file changed."""
+        try:
+            with open(
+                os.path.join(self.directory, MANIFEST_FILENAME), encoding="utf-8"
+            ) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+        if (
+            manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("type") != self.type_name
+            or manifest.get("size") != trace_stat.st_size
+            or manifest.get("mtime") != trace_stat.st_mtime_ns
+        ):
+            return None
+        return manifest
+
+    def extract(self, trace, comparisons, stored=(), pbar=None):
+        """Read the messages of the OSITraceReader trace and gather the columns
+        of the comparisons. The timesteps of the tables are gathered unless
+        they are already stored."""
+        # table => {chain: (column type, values, set)}
+        tables = dict()
+        for comparison in comparisons:
+            tables.setdefault(comparison.table, dict())[comparison.chain] = (
+                comparison.column_type,
+                array(ARRAY_TYPECODES[comparison.column_type]),
+                array("B"),
+            )
+        timesteps = {
+            table: array("q")
+            for table in tables
+            if self.get_table_name(table) not in stored
+        }
+
+        position = trace.file_position
+        for timestep, message in enumerate(trace):
+            messages = {(): [message]}
+            for table, chains in tables.items():
+                rows = get_rows(messages, table)
+                if not rows:
+                    continue
+                if table in timesteps:
+                    timesteps[table].extend([timestep] * len(rows))
+                for chain, (_, values, is_set) in chains.items():
+                    values.extend(get_value(row, chain) for row in rows)
+                    is_set.extend(
+                        osi_vectorized_rules.is_set(row, chain) for row in rows
+                    )
+            if pbar is not None:
+                pbar.update(trace.file_position - position)
+                position = trace.file_position
+
+        for table, chains in tables.items():
+            if table in timesteps:
+                self.columns[self.get_table_name(table)] = numpy.frombuffer(
+                    timesteps[table], numpy.int64
+                )
+            for chain, (column_type, values, is_set) in chains.items():
+                name = ".".join((self.type_name,) + table + chain)
+                self.columns[name] = numpy.frombuffer(values, column_type)
+                self.columns[name + IS_SET_SUFFIX] = numpy.frombuffer(
+                    is_set, numpy.uint8
+                ).astype(bool)
+
+    def save(self, manifest):
+        """Write the extracted columns and the manifest listing all the stored
+        columns"""
+        os.makedirs(self.directory, exist_ok=True)
+        for name, column in self.columns.items():
+            numpy.save(os.path.join(self.directory, name + ".npy"), column)
+        manifest["columns"] = sorted(set(manifest["columns"]) | set(self.columns))
+        # The manifest is written last, so that it only lists complete columns
+        manifest_path = os.path.join(self.directory, MANIFEST_FILENAME)
+        with open(manifest_path + "." + str(os.getpid()), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(manifest_path + "." + str(os.getpid()), manifest_path)
+
+    def check(self, comparisons, aggregator, timesteps=None):
+        """Check the comparisons on the columns and add their failures to an
+        OSILogAggregator, one per failing row at the timestep of the row. The
+        messages are added in the order of their first failure. If timesteps
+        is given, e.g. the indices of a window of the trace, only the rows of
+        these timesteps are checked."""
+        if timesteps is not None:
+            timesteps = numpy.asarray(timesteps, dtype=numpy.int64)
+        failures = []
+        for index, comparison in enumerate(comparisons):
+            values, is_set = (
+                self.columns[name] for name in self.get_column_names(comparison)
+            )
+            comparison_function = osi_vectorized_rules.COMPARISONS[comparison.rule.verb]
+            fails = numpy.logical_not(
+                osi_vectorized_rules.compare(
+                    comparison_function, values, comparison.rule.params
+                )
+            )
+            numpy.logical_and(fails, is_set, out=fails)
+            row_timesteps = self.columns[self.get_table_name(comparison.table)]
+            if timesteps is not None:
+                numpy.logical_and(
+                    fails, numpy.isin(row_timesteps, timesteps), out=fails
+                )
+            failing_timesteps = row_timesteps[fails]
+            if len(failing_timesteps):
+                failures.append(
+                    (int(failing_timesteps.min()), index, failing_timesteps)
+                )
+
+        for _, index, failing_timesteps in sorted(
+            failures, key=lambda failure: failure[:2]
+        ):
+            comparison = comparisons[index]
+            message = osi_rules_implementations.get_failure_message(
+                comparison.rule, comparison.get_path(self.type_name)
+            )
+            severity = comparison.rule.severity.value
+            aggregator.extend(
+                (severity, timestep, message) for timestep in failing_timesteps.tolist()
+            )
@@ -0,0 +1,106 @@
+"""
+This module opens compressed OSI trace files, e.g. ``.osi.xz`` archives, as
+streams of their decompressed content, so that they can be validated without
+decompressing them to disk first.
+"""
+
+import gzip
+import lzma
+
+try:
+    import zstandard
+except ImportError:
+    # Optional, only needed for zstd compressed traces
+    zstandard = None
+
+# Magic numbers at the beginning of the compressed files of each codec
+COMPRESSION_MAGICS = {
+    "gzip": b"\x1f\x8b",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+
+def detect_compression(path):
+    """Return the codec ("gzip", "xz" or "zstd") of a compressed trace file,
+    or None if it is not compressed"""
+    with open(path, "rb") as trace_file:
+        magic = trace_file.read(
+            max(len(magic) for magic in COMPRESSION_MAGICS.values())
+        )
+    for compression, compression_magic in COMPRESSION_MAGICS.items():
+        if magic.startswith(compression_magic):
+            return compression
+    return None
+
+
+def open_decompressor(compressed_file, compression):
+    """Return a file object reading the decompressed content of a compressed
+    file object"""
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=compressed_file, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(compressed_file, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError(
+                "Install the zstandard package to read zstd compressed traces"
+            )
+        return zstandard.ZstdDecompressor().stream_reader(
+            compressed_file, read_across_frames=True, closefd=False
+        )
+    raise ValueError("Unknown compression: " + str(compression))
+
+
+class CompressedTraceFile:
+    """Binary file of the decompressed content of a compressed trace file.
+
+    The content is decompressed while it is read. Seeking forward skips the
+    content in between, seeking backward is only supported by some codecs
+    and decompresses again from the beginning.
+    """
+
+    def __init__(self, path, compression):
+        self.compression = compression
+        self.compressed_file = open(path, "rb")
+        try:
+            self.file = open_decompressor(self.compressed_file, compression)
+        except Exception:
+            self.compressed_file.close()
+            raise
+
+    @property
+    def compressed_position(self):
+        """Number of compressed bytes read from the trace file"""
+        return self.compressed_file.tell()
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def seek(self, offset):
+        if offset != self.file.tell():
+            self.file.seek(offset)
+        return offset
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        """Close the trace file"""
+        self.file.close()
+        self.compressed_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+
+def open_trace_file(path):
+    """Open a trace file for binary reading of its messages, decompressing it
+    if it is compressed"""
+    compression = detect_compression(path)
+    if compression is None:
+        return open(path, "rb")
+    return CompressedTraceFile(path, compression)
@@ -0,0 +1,250 @@
+"""
+This module contains the OSITraceIndex which records the position and the
+timestamp of each message of an OSI trace file, so that the messages of a
+window of the trace can be read without decoding the previous ones.
+"""
+
+import os
+import random
+import struct
+import sys
+from array import array
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+
+import osi_trace_compression
+
+# Size of the length prefix of each message in an OSI trace file
+HEADER_SIZE = 4
+
+# Number of bytes read to find the timestamp at the beginning of a message
+TIMESTAMP_PREFIX_SIZE = 256
+
+INDEX_EXTENSION = ".idx"
+INDEX_MAGIC = b"OSIIDX01"
+
+# magic, size and modification time of the trace file, number of messages
+INDEX_HEADER = struct.Struct("<8sQqQ")
+
+
+def iter_message_ranges(trace_file):
+    """Yield the byte range (offset, size) of each length-prefixed message of
+    an opened OSI trace file without decoding the messages."""
+    offset = 0
+    trace_file.seek(offset)
+    while True:
+        header = trace_file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            return
+        size = struct.unpack("<L", header)[0]
+        yield offset + HEADER_SIZE, size
+        offset += HEADER_SIZE + size
+        trace_file.seek(offset)
+
+
+def get_message_ranges(path):
+    """Yield the byte range (offset, size) of each length-prefixed message of
+    an OSI trace file without decoding the messages. The ranges of compressed
+    trace files are in their decompressed content."""
+    with osi_trace_compression.open_trace_file(path) as trace_file:
+        yield from iter_message_ranges(trace_file)
+
+
+def read_varint(data, pos):
+    """Decode a protobuf varint at position pos. Return the value and the
+    position after it."""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def find_field(data, field_number):
+    """Return the serialized value of a length-delimited (message) field of a
+    serialized message by reading only its top-level field keys, or None if the
+    field is not found in data."""
+    pos = 0
+    try:
+        while pos < len(data):
+            key, pos = read_varint(data, pos)
+            wire_type = key & 0x7
+            if wire_type == 0:
+                _, pos = read_varint(data, pos)
+            elif wire_type == 1:
+                pos += 8
+            elif wire_type == 2:
+                length, pos = read_varint(data, pos)
+                if key >> 3 == field_number:
+                    if pos + length > len(data):
+                        return None
+                    return data[pos : pos + length]
+                pos += length
+            elif wire_type == 5:
+                pos += 4
+            else:
+                # Groups are not used in OSI
+                return None
+    except IndexError:
+        # The field is not in the (partially read) data
+        pass
+    return None
+
+
+class OSITraceIndex:
+    """Offset, size and timestamp (in nanoseconds, -1 if unknown) of each
+    message of an OSI trace file. The offsets of compressed trace files are in
+    their decompressed content.
+
+    The index is stored next to the trace file (with the extension ``.idx``)
+    and rebuilt when the trace file changes.
+    """
+
+    def __init__(self):
+        self.offsets = array("q")
+        self.sizes = array("q")
+        self.timestamps = array("q")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @staticmethod
+    def get_index_path(path):
+        """Return the path of the index file of a trace file"""
+        return path + INDEX_EXTENSION
+
+    @classmethod
+    def load_or_build(cls, path, message_type):
+        """Return the index of a trace file. It is read from the index file if
+        it is up to date, otherwise it is built and saved."""
+        index_path = cls.get_index_path(path)
+        trace_stat = os.stat(path)
+
+        index = cls.load(index_path, trace_stat)
+        if index is None:
+            index = cls.build(path, message_type)
+            try:
+                index.save(index_path, trace_stat)
+            except OSError as e:
+                print(f"WARNING: Could not save the trace index {index_path}: {e}")
+
+        return index
+
+    @classmethod
+    def build(cls, path, message_type):
+        """Build the index of a trace file of messages of type message_type"""
+        index = cls()
+
+        timestamp_field = message_type.DESCRIPTOR.fields_by_name.get("timestamp")
+        timestamp_type = type(message_type().timestamp) if timestamp_field else None
+
+        with osi_trace_compression.open_trace_file(path) as trace_file:
+            for offset, size in iter_message_ranges(trace_file):
+                timestamp = -1
+                if timestamp_field is not None:
+                    data = trace_file.read(min(size, TIMESTAMP_PREFIX_SIZE))
+                    serialized_timestamp = find_field(data, timestamp_field.number)
+                    if serialized_timestamp is None and size > len(data):
+                        # Compressed trace files are only read forward
+                        data += trace_file.read(size - len(data))
+                        serialized_timestamp = find_field(data, timestamp_field.number)
+                    if serialized_timestamp is not None:
+                        message_timestamp = timestamp_type.FromString(
+                            serialized_timestamp
+                        )
+                        timestamp = (
+                            message_timestamp.seconds * 1000000000
+                            + message_timestamp.nanos
+                        )
+
+                index.offsets.append(offset)
+                index.sizes.append(size)
+                index.timestamps.append(timestamp)
+
+        return index
+
+    @classmethod
+    def load(cls, index_path, trace_stat):
+        """Read an index file. Return None if it does not exist or if it does
+        not match the trace file anymore."""
+        try:
+            with open(index_path, "rb") as index_file:
+                header = index_file.read(INDEX_HEADER.size)
+                if len(header) < INDEX_HEADER.size:
+                    return None
+                magic, size, mtime, count = INDEX_HEADER.unpack(header)
+                if (
+                    magic != INDEX_MAGIC
+                    or size != trace_stat.st_size
+                    or mtime != trace_stat.st_mtime_ns
+                ):
+                    return None
+
+                index = cls()
+                for column in (index.offsets, index.sizes, index.timestamps):
+                    column.fromfile(index_file, count)
+                    if sys.byteorder == "big":
+                        column.byteswap()
+        except (OSError, EOFError):
+            return None
+
+        return index
+
+    def save(self, index_path, trace_stat):
+        """Write the index file"""
+        with open(index_path, "wb") as index_file:
+            index_file.write(
+                INDEX_HEADER.pack(
+                    INDEX_MAGIC, trace_stat.st_size, trace_stat.st_mtime_ns, len(self)
+                )
+            )
+            for column in (self.offsets, self.sizes, self.timestamps):
+                if sys.byteorder == "big":
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(index_file)
+
+    def select(self, from_timestep=None, to_timestep=None, timestamp_range=None):
+        """Return the indices of the messages within the range of timesteps
+        (both included) and whose timestamp (in seconds) is within the
+        timestamp_range (both included) if given."""
+        first = from_timestep or 0
+        last = len(self) - 1 if to_timestep is None else min(to_timestep, len(self) - 1)
+        indices = range(first, last + 1)
+
+        if timestamp_range is not None:
+            start, end = (round(t * 1000000000) for t in timestamp_range)
+            indices = [i for i in indices if start <= self.timestamps[i] <= end]
+
+        return indices
+
+    def sample(self, indices, every=None, count=None, seed=None, interval=None):
+        """Return a deterministic sample of the given message indices: every
+        k-th message, count messages drawn at random with the seed, or the
+        first message of each interval (in seconds) of timestamps. Messages
+        without timestamp are not sampled by interval."""
+        if every:
+            indices = indices[::every]
+        if count and count < len(indices):
+            indices = sorted(random.Random(seed).sample(list(indices), count))
+        if interval:
+            stride = round(interval * 1000000000)
+            sampled = []
+            start = next_timestamp = None
+            for index in indices:
+                timestamp = self.timestamps[index]
+                if timestamp < 0:
+                    continue
+                if start is None:
+                    start = timestamp
+                if next_timestamp is None or timestamp >= next_timestamp:
+                    sampled.append(index)
+                    # The intervals are aligned on the first timestamp
+                    next_timestamp = (
+                        start + ((timestamp - start) // stride + 1) * stride
+                    )
+            indices = sampled
+        return indices
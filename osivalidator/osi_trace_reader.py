@@ -0,0 +1,184 @@
+"""
+This module contains the OSITraceReader which reads the length-prefixed
+messages of an OSI trace file.
+"""
+
+import io
+import mmap
+import queue
+import struct
+import threading
+import os, sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+
+import osi_trace_compression
+from osi_trace_index import HEADER_SIZE, iter_message_ranges
+
+# Format of the length prefix of each message in an OSI trace file
+HEADER = struct.Struct("<L")
+
+
+# Time after which a blocked reader thread checks if it has to stop
+READ_AHEAD_TIMEOUT = 0.1
+
+
+def read_serialized_messages(path, message_ranges=None):
+    """Yield (index, progress, serialized message) for the (index, offset,
+    size) ranges of a trace file, or for all its messages in order if
+    message_ranges is None. The progress is the number of bytes of the trace
+    file read for the message, compressed bytes for compressed traces."""
+    with osi_trace_compression.open_trace_file(path) as trace_file:
+        if message_ranges is None:
+            message_ranges = (
+                (index, offset, size)
+                for index, (offset, size) in enumerate(iter_message_ranges(trace_file))
+            )
+        compressed = isinstance(trace_file, osi_trace_compression.CompressedTraceFile)
+        position = 0
+        for index, offset, size in message_ranges:
+            trace_file.seek(offset)
+            data = trace_file.read(size)
+            if len(data) < size:
+                return
+            if compressed:
+                progress = trace_file.compressed_position - position
+                position += progress
+            else:
+                progress = size + HEADER_SIZE
+            yield index, progress, data
+
+
+def read_ahead(items, depth):
+    """Yield the items of an iterator, e.g. of ``read_serialized_messages``.
+    They are produced by a background thread up to depth items ahead, so that
+    reading the trace file overlaps with the processing of the messages."""
+    pending = queue.Queue(depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=READ_AHEAD_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for item in items:
+                if not put(item):
+                    break
+        except Exception as e:
+            put(e)
+        finally:
+            put(None)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+
+
+class OSITraceReader:
+    """Reader of the messages of an OSI trace file.
+
+    If buffer_size is 0, the trace file is memory-mapped and the messages are
+    parsed from slices of the mapping without copying them. Otherwise, the
+    messages are read from the file with a buffer of buffer_size bytes.
+    Compressed trace files (see osi_trace_compression) are decompressed while
+    they are read, their offsets are in the decompressed content.
+    """
+
+    def __init__(self, path, message_type, buffer_size=0):
+        self.message_type = message_type
+        # Position after the last message read when iterating over the trace
+        self.position = 0
+        self.mapping = None
+        self.view = None
+
+        self.compression = osi_trace_compression.detect_compression(path)
+        if self.compression is not None:
+            self.file = osi_trace_compression.CompressedTraceFile(
+                path, self.compression
+            )
+        elif buffer_size == 0:
+            self.file = open(path, "rb")
+            # Empty files cannot be mapped
+            if os.fstat(self.file.fileno()).st_size > 0:
+                self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self.mapping)
+        else:
+            self.file = io.BufferedReader(io.FileIO(path, "rb"), buffer_size)
+
+    @property
+    def file_position(self):
+        """Number of bytes of the trace file read when iterating over the
+        trace, compressed bytes for compressed traces"""
+        if self.compression is not None:
+            return self.file.compressed_position
+        return self.position
+
+    def __iter__(self):
+        """Yield the messages of the trace from the current position on"""
+        if self.mapping is None:
+            yield from self.read_file()
+            return
+
+        view = self.view
+        end = len(view)
+        while self.position + HEADER_SIZE <= end:
+            start = self.position + HEADER_SIZE
+            stop = start + HEADER.unpack_from(view, self.position)[0]
+            if stop > end:
+                # Truncated message at the end of the trace
+                return
+            self.position = stop
+            yield self.message_type.FromString(view[start:stop])
+
+    def read_file(self):
+        """Yield the messages of the trace from the current position on,
+        reading them from the file"""
+        self.file.seek(self.position)
+        while True:
+            header = self.file.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                return
+            size = HEADER.unpack(header)[0]
+            data = self.file.read(size)
+            if len(data) < size:
+                return
+            self.position += HEADER_SIZE + size
+            yield self.message_type.FromString(data)
+
+    def read_message(self, offset, size):
+        """Parse the message of the given size at the given offset of the
+        trace"""
+        if self.mapping is not None:
+            return self.message_type.FromString(self.view[offset : offset + size])
+        self.file.seek(offset)
+        return self.message_type.FromString(self.file.read(size))
+
+    def close(self):
+        """Close the trace file"""
+        if self.mapping is not None:
+            self.view.release()
+            try:
+                self.mapping.close()
+            except BufferError:
+                # A slice of the mapping is still referenced, the mapping is
+                # closed when it is garbage collected
+                pass
+            self.mapping = None
+            self.view = None
+        self.file.close()
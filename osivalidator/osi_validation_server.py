@@ -0,0 +1,304 @@
+"""
+This module contains the OSIValidationServer which validates the OSI messages
+of live streams, e.g. of a running simulation, sent over a TCP or Unix socket.
+
+The client sends length-prefixed OSI messages, with the same framing as in OSI
+trace files. For each message, the server sends back a length-prefixed JSON
+verdict in the order of the messages:
+
+    {"timestep": 0, "valid": false, "errors": [...], "warnings": [...],
+     "failure": null}
+
+"failure" is the exception raised while validating the message, if any.
+Each connection is a trace: its messages are its consecutive timesteps.
+"""
+
+import json
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+from array import array
+from multiprocessing import Pool
+from osi3trace.osi_trace import OSITrace
+import os, sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+
+import osi_rules_checker
+import osi_trace_reader
+import osi_validator
+import osi_validator_logger
+
+# Default number of messages of a connection which are validated or waiting
+# for their verdict to be sent. The server stops reading the messages of the
+# connection when it is reached.
+MAX_PENDING = 64
+
+# Percentiles of the latency reported for each connection
+LATENCY_PERCENTILES = (50, 90, 99)
+
+# State of a worker process of the server, set by init_worker
+WORKER_VALIDATOR = None
+WORKER_MESSAGE_TYPE = None
+
+
+def init_worker(data_type, rules_path, rules_cache):
+    """Initialize a worker process of the server with the preloaded rules"""
+    global WORKER_VALIDATOR, WORKER_MESSAGE_TYPE
+
+    # The server process handles the interruption and terminates the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    WORKER_VALIDATOR = osi_validator.OSIValidator(rules_path, rules_cache)
+    # The IDs are tracked over the stream by the connection
+    WORKER_VALIDATOR.checker.id_tracker = None
+    WORKER_MESSAGE_TYPE = OSITrace.map_message_type(data_type)
+
+
+def validate_serialized(timestep, data):
+    """Decode and validate a serialized message in a worker process. Return
+    the log messages, the observed IDs to track over the stream and the
+    exception raised during validation, if any."""
+    try:
+        message = WORKER_MESSAGE_TYPE.FromString(data)
+        checker = WORKER_VALIDATOR.checker
+        log_messages = osi_validator.process_message(
+            checker,
+            WORKER_VALIDATOR.rules,
+            message,
+            timestep,
+            WORKER_MESSAGE_TYPE.DESCRIPTOR.name,
+        )
+        return log_messages, checker.pop_id_observations(), None
+    except Exception as e:
+        return [], [], str(e)
+
+
+def parse_address(address):
+    """Return the socket family and address of "HOST:PORT" for TCP or of
+    "unix:PATH" for a Unix socket"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "localhost", int(port))
+
+
+def read_exactly(stream, size):
+    """Read size bytes of a stream. Return None at the end of the stream."""
+    data = stream.read(size)
+    if len(data) < size:
+        return None
+    return data
+
+
+def get_percentiles(values, percentiles):
+    """Return the percentiles (nearest rank) of a list of values"""
+    values = sorted(values)
+    return {
+        percentile: values[max(0, -(-percentile * len(values) // 100) - 1)]
+        for percentile in percentiles
+    }
+
+
+class ConnectionHandler(socketserver.StreamRequestHandler):
+    """Validate the messages of a connection and send back their verdicts"""
+
+    def handle(self):
+        server = self.server
+        # (timestep, receive time, pending result) of the received messages
+        pending = queue.Queue()
+        # A slot is taken before a message is submitted and released once its
+        # verdict is sent
+        slots = threading.Semaphore(server.max_pending)
+        reader = threading.Thread(target=self.read_messages, args=(pending, slots))
+        reader.start()
+
+        logger = osi_validator_logger.OSIValidatorLogger()
+        logger.init_collect_only(False)
+        checker = osi_rules_checker.OSIRulesChecker(logger)
+        latencies = array("d")
+
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                timestep, receive_time, result = item
+                log_messages, id_observations, failure = result.get()
+
+                # Same merge as in the parallel validation of a trace file
+                logger.replay(log_messages)
+                checker.track_id_observations(timestep, id_observations)
+                log_messages = logger.log_messages.pop(timestep, [])
+
+                self.send_verdict(timestep, log_messages, failure)
+                slots.release()
+                latencies.append(time.perf_counter() - receive_time)
+        except OSError:
+            # The client closed the connection, stop reading its messages
+            self.connection.shutdown(socket.SHUT_RD)
+            slots.release()
+            while pending.get() is not None:
+                slots.release()
+        finally:
+            reader.join()
+            server.report_latencies(self.client_address, latencies)
+
+    def read_messages(self, pending, slots):
+        """Read the messages of the connection and submit them to the worker
+        pool. Blocks while max_pending messages are pending, i.e. while no
+        slot is free."""
+        timestep = 0
+        try:
+            while True:
+                header = read_exactly(self.rfile, osi_trace_reader.HEADER.size)
+                if header is None:
+                    break
+                size = osi_trace_reader.HEADER.unpack(header)[0]
+                data = read_exactly(self.rfile, size)
+                if data is None:
+                    break
+                receive_time = time.perf_counter()
+                slots.acquire()
+                result = self.server.pool.apply_async(
+                    validate_serialized, (timestep, data)
+                )
+                pending.put((timestep, receive_time, result))
+                timestep += 1
+        except OSError:
+            pass
+        finally:
+            pending.put(None)
+
+    def send_verdict(self, timestep, log_messages, failure):
+        """Send the length-prefixed JSON verdict of a message"""
+        verdict = {
+            "timestep": timestep,
+            "valid": not log_messages and failure is None,
+            "errors": [str(msg) for severity, _, msg in log_messages if severity == 40],
+            "warnings": [
+                str(msg) for severity, _, msg in log_messages if severity != 40
+            ],
+            "failure": failure,
+        }
+        data = json.dumps(verdict).encode()
+        self.wfile.write(osi_trace_reader.HEADER.pack(len(data)) + data)
+        self.wfile.flush()
+
+
+class OSIValidationServerMixin:
+    """Server validating the OSI messages of each connection with a pool of
+    worker processes holding the preloaded rules"""
+
+    daemon_threads = True
+
+    def init_validation(
+        self, data_type, rules_path, rules_cache, processes, max_pending
+    ):
+        """Start the worker pool"""
+        if max_pending < 1:
+            raise ValueError(f"max_pending must be at least 1, got {max_pending}")
+        self.max_pending = max_pending
+        # Fail on invalid rules before accepting connections, and fill the
+        # rules cache for the workers
+        osi_validator.OSIValidator(rules_path, rules_cache)
+        self.pool = Pool(
+            processes,
+            initializer=init_worker,
+            initargs=(data_type, rules_path, rules_cache),
+        )
+
+    def server_close(self):
+        super().server_close()
+        self.pool.terminate()
+        self.pool.join()
+
+    def report_latencies(self, client_address, latencies):
+        """Print the percentiles of the latencies (in seconds) between the
+        reception of the messages of a connection and their verdict"""
+        if not latencies:
+            return
+        percentiles = get_percentiles(latencies, LATENCY_PERCENTILES)
+        print(
+            f"Connection {client_address or 'local'}: {len(latencies)} messages, "
+            + ", ".join(
+                f"p{percentile} {value * 1000:.2f} ms"
+                for percentile, value in percentiles.items()
+            )
+            + f", max {max(latencies) * 1000:.2f} ms"
+        )
+
+
+class OSIValidationServer(OSIValidationServerMixin, socketserver.ThreadingTCPServer):
+    """Validation server on a TCP socket"""
+
+    allow_reuse_address = True
+
+
+class OSIUnixValidationServer(
+    OSIValidationServerMixin, socketserver.ThreadingUnixStreamServer
+):
+    """Validation server on a Unix socket"""
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def create_server(
+    address,
+    data_type,
+    rules_path=None,
+    rules_cache=None,
+    processes=None,
+    max_pending=MAX_PENDING,
+):
+    """Return a validation server listening on "HOST:PORT" (TCP) or on
+    "unix:PATH" (Unix socket)"""
+    family, server_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        server = OSIUnixValidationServer(server_address, ConnectionHandler)
+    else:
+        server = OSIValidationServer(server_address, ConnectionHandler)
+    try:
+        server.init_validation(
+            data_type, rules_path, rules_cache, processes, max_pending
+        )
+    except Exception:
+        server.socket.close()
+        raise
+    return server
+
+
+def interrupt(_signum, _frame):
+    """Handler of the termination signal, which interrupts the server like
+    Ctrl+C"""
+    raise KeyboardInterrupt
+
+
+def serve(args):
+    """Run the validation server of the command line arguments until it is
+    interrupted"""
+    data_type = args.type or "SensorView"
+    server = create_server(
+        args.serve,
+        data_type,
+        args.rules,
+        args.rules_cache,
+        args.parallel or None,
+        args.max_pending,
+    )
+    print(f"Validating {data_type} messages on {args.serve} ...")
+    signal.signal(signal.SIGTERM, interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,137 @@
+"""
+This module contains the OSIValidator which validates OSI messages in memory,
+e.g. inline in a co-simulation, without the command line interface.
+"""
+
+import os, sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+
+import osi_rules
+import osi_rules_checker
+import osi_validator_logger
+import linked_proto_field
+
+
+def process_message(checker, rules, message, timestep, data_type):
+    """Check a message with the rules and return the (severity, timestep,
+    message) tuples logged for it. If the check raises, the messages logged
+    until then are kept in the ``log_messages`` attribute of the exception."""
+    logger = checker.logger
+    checker.reset()
+    timestamp = checker.set_timestamp(message.timestamp, timestep)
+
+    logger.log_messages[timestep] = []
+    logger.debug_messages[timestep] = []
+    logger.info(None, f"Analyze message of timestamp {timestamp}", False)
+
+    # Check common rules
+    try:
+        checker.check_plan(
+            linked_proto_field.LinkedProtoField(message, name=data_type),
+            rules.compile(data_type, message.DESCRIPTOR),
+        )
+    except Exception as e:
+        e.log_messages = logger.log_messages[timestep]
+        raise
+    finally:
+        # Only the aggregated messages are kept in memory
+        log_messages = logger.log_messages.pop(timestep)
+        logger.debug_messages.pop(timestep)
+
+    return log_messages
+
+
+class OSIValidationReport:
+    """Messages logged for a validated OSI message"""
+
+    def __init__(self, timestep, log_messages):
+        self.timestep = timestep
+        # [(severity, timestep, message), ...] in the order they were logged
+        self.log_messages = log_messages
+
+    def __len__(self):
+        return len(self.log_messages)
+
+    @property
+    def is_valid(self):
+        """True if no error nor warning was logged"""
+        return not self.log_messages
+
+    @property
+    def errors(self):
+        """Texts of the logged errors"""
+        return [
+            str(message) for severity, _, message in self.log_messages if severity == 40
+        ]
+
+    @property
+    def warnings(self):
+        """Texts of the logged warnings"""
+        return [
+            str(message) for severity, _, message in self.log_messages if severity == 30
+        ]
+
+
+class OSIValidator:
+    """Validate OSI messages with a set of rules.
+
+    The rules are loaded once and the validator can be kept for all the
+    messages of a simulation. The consecutive validated messages are the
+    timesteps of a trace, which is used by the rules over time like
+    is_stable_over_time. Call ``reset`` to start a new trace.
+
+    If incremental is True, the verdicts of the rules which only depend on an
+    element of a repeated field, e.g. on a lane, are reused for the identical
+    elements of the next message.
+
+    A validator is not thread-safe, use one validator per thread.
+    """
+
+    def __init__(self, rules_path=None, rules_cache=None, incremental=False):
+        self.rules = osi_rules.OSIRules()
+        self.logger = osi_validator_logger.OSIValidatorLogger()
+        # Messages are returned in the reports instead of being logged
+        self.logger.init_collect_only(False)
+        self.incremental = incremental
+        self.checker = self.create_checker()
+        self.timestep = 0
+
+        if rules_path is not None:
+            self.load_rules(rules_path, rules_cache)
+
+    def create_checker(self):
+        """Return the rules checker of a new trace"""
+        checker = osi_rules_checker.OSIRulesChecker(self.logger)
+        checker.incremental = self.incremental
+        return checker
+
+    def load_rules(self, path=None, cache_path=None):
+        """Load the rules of a rules directory (the default rules if path is
+        None), see ``OSIRules.from_yaml_directory``"""
+        rules = osi_rules.OSIRules()
+        rules.from_yaml_directory(path, cache_path)
+        self.rules = rules
+
+    def reset(self):
+        """Start a new trace"""
+        self.checker = self.create_checker()
+        self.timestep = 0
+
+    def validate(self, message):
+        """Validate the message of the next timestep and return its
+        OSIValidationReport"""
+        timestep = self.timestep
+        self.timestep += 1
+        log_messages = process_message(
+            self.checker, self.rules, message, timestep, message.DESCRIPTOR.name
+        )
+        return OSIValidationReport(timestep, log_messages)
+
+    def validate_stream(self, messages):
+        """Validate the messages of an iterable as the next timesteps and
+        return the logged messages aggregated in an OSILogAggregator"""
+        aggregator = osi_validator_logger.OSILogAggregator()
+        for message in messages:
+            aggregator.extend(self.validate(message).log_messages)
+        return aggregator
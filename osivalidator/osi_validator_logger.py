@@ -4,10 +4,12 @@ Python logging module.
 """
 
 import logging
+import math
 import time
 
-import itertools
 import textwrap
+from array import array
+from bisect import bisect_right
 from tabulate import tabulate
 
 from functools import wraps
@@ -17,6 +19,9 @@ import os, sys
 sys.path.append(os.path.join(os.path.dirname(__file__), "."))
 import osi_rules
 
+# z-score of the 95% confidence intervals of the sampled failure rates
+CONFIDENCE_Z = 1.959963984540054
+
 
 def log(func):
     """Wrapper for logging function"""
@@ -62,8 +67,11 @@ class OSIValidatorLogger:
         self.formatter = logging.Formatter("%(levelname)-7s -- %(message)s")
         self.logger.setLevel(logging.DEBUG if debug else logging.INFO)
         self._is_cli_output_set = False
+        self.collect_only = False
         self.conn = None
         self.dbname = None
+        # Timestamp in the name of the log files
+        self.files_timestamp = None
 
     def init_cli_output(self, verbose):
         """Initialize the CLI output"""
@@ -89,9 +97,17 @@ class OSIValidatorLogger:
         self.init_logging_storage(files, output_path)
         self.init_cli_output(verbose)
 
+    def init_collect_only(self, debug):
+        """Initialize the logger to only collect the messages without passing
+        them to the Python logger, e.g. in the worker processes of a parallel
+        validation. The collected messages can be logged with ``replay``."""
+        self.debug_mode = debug
+        self.collect_only = True
+
     def init_logging_storage(self, files, output_path):
         """Initialize (create or set handler) for the specified logging storage"""
         timestamp = time.time()
+        self.files_timestamp = timestamp
         self._init_logging_to_files(timestamp, output_path)
 
     def _init_logging_to_files(self, timestamp, output_path):
@@ -127,22 +143,25 @@ class OSIValidatorLogger:
         """Wrapper for python debug logger"""
         if self.debug_mode:
             self.debug_messages[timestamp].append((10, timestamp, msg))
-        msg = "[TS " + str(timestamp) + "]" + msg
-        return self.logger.debug(msg, *args, **kwargs)
+        if self.collect_only:
+            return None
+        return self.logger.debug("[TS %s]%s", timestamp, msg, *args, **kwargs)
 
     @log
     def warning(self, timestamp, msg, *args, **kwargs):
         """Wrapper for python warning logger"""
         self.log_messages[timestamp].append((30, timestamp, msg))
-        msg = "[TS " + str(timestamp) + "]" + msg
-        return self.logger.warning(msg, *args, **kwargs)
+        if self.collect_only:
+            return None
+        return self.logger.warning("[TS %s]%s", timestamp, msg, *args, **kwargs)
 
     @log
     def error(self, timestamp, msg, *args, **kwargs):
         """Wrapper for python error logger"""
         self.log_messages[timestamp].append((40, timestamp, msg))
-        msg = "[TS " + str(timestamp) + "]" + msg
-        return self.logger.error(msg, *args, **kwargs)
+        if self.collect_only:
+            return None
+        return self.logger.error("[TS %s]%s", timestamp, msg, *args, **kwargs)
 
     @log
     def info(self, timestamp, msg, *args, **kwargs):
@@ -151,52 +170,200 @@ class OSIValidatorLogger:
             return self.logger.info(msg, *args, **kwargs)
         return 0
 
-    def synthetize_results(self, messages):
-        """Aggregate the sqlite log and output a synthetized version of the
-        result"""
-
-        def ranges(i):
-            group = itertools.groupby(enumerate(i), lambda x_y: x_y[1] - x_y[0])
-            for _, second in group:
-                second = list(second)
-                yield second[0][1], second[-1][1]
-
-        def format_ranges(ran):
-            if ran[0] == ran[1]:
-                return str(ran[0])
-            return f"[{ran[0]}, {ran[1]}]"
-
-        def process_timestamps(distinct_messages):
-            results = []
-            range_dict = {message[2]: [] for message in distinct_messages}
-            for message in distinct_messages:
-                if not message[1] in range_dict[message[2]]:
-                    range_dict[message[2]].append(message[1])
-
-            for message_key, timestamps in range_dict.items():
-                # Timestamps need to be sorted before the ranges can be determined
-                ts_ranges = ", ".join(map(format_ranges, ranges(sorted(timestamps))))
-                results.append(
-                    [wrapper_ranges.fill(ts_ranges), wrapper.fill(message_key)]
-                )
-            return results
-
-        wrapper_ranges = textwrap.TextWrapper(width=40)
-        wrapper = textwrap.TextWrapper(width=200)
-        return print_synthesis("Warnings", process_timestamps(messages))
+    def replay(self, messages):
+        """Log (severity, timestamp, message) tuples collected by another
+        logger, e.g. in a worker process, in their original order"""
+        for severity, timestamp, msg in messages:
+            if severity == 40:
+                self.error(timestamp, msg)
+            else:
+                self.warning(timestamp, msg)
+
+    def synthetize_results(self, aggregator):
+        """Output a synthetized version of the result from the messages
+        aggregated by an OSILogAggregator"""
+        return print_synthesis("Warnings", get_synthesis_table(aggregator))
+
+
+class OSILogAggregator:
+    """Aggregate the logged (severity, timestamp, message) tuples into the
+    sorted ranges of consecutive timestamps at which each distinct message
+    was logged.
+
+    The ranges are updated as the messages are added, so the memory only
+    depends on the number of distinct messages and of their ranges, not on
+    the number of logged messages.
+    """
+
+    def __init__(self):
+        # message => array of the (first, last) timestamps of its ranges
+        self._ranges = dict()
+        self.count = 0
+        # Number of added messages of severity ERROR
+        self.error_count = 0
+        # Timestamp of the first added message of severity ERROR
+        self.first_error_timestamp = None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, timestamp, message):
+        """Add a message logged at a timestamp"""
+        self.count += 1
+        ranges = self._ranges.get(message)
+        if ranges is None:
+            self._ranges[message] = array("q", (timestamp, timestamp))
+            return
+
+        # Timestamps are mostly added in increasing order
+        if timestamp > ranges[-1]:
+            if timestamp == ranges[-1] + 1:
+                ranges[-1] = timestamp
+            else:
+                ranges.extend((timestamp, timestamp))
+            return
+
+        # The flat (first, last, first, last, ...) array is sorted: an odd
+        # position is inside a range, an even one after the last of a range
+        position = bisect_right(ranges, timestamp)
+        if position % 2 or (position > 0 and ranges[position - 1] == timestamp):
+            # Already in a range
+            return
+
+        # Index of the first range starting after the timestamp
+        index = position // 2
+        merge_previous = index > 0 and ranges[2 * index - 1] == timestamp - 1
+        merge_next = index < len(ranges) // 2 and ranges[2 * index] == timestamp + 1
+        if merge_previous and merge_next:
+            del ranges[2 * index - 1 : 2 * index + 1]
+        elif merge_previous:
+            ranges[2 * index - 1] = timestamp
+        elif merge_next:
+            ranges[2 * index] = timestamp
+        else:
+            ranges[2 * index : 2 * index] = array("q", (timestamp, timestamp))
+
+    def extend(self, log_messages):
+        """Add (severity, timestamp, message) tuples"""
+        for severity, timestamp, message in log_messages:
+            if severity == 40:
+                if self.error_count == 0:
+                    self.first_error_timestamp = timestamp
+                self.error_count += 1
+            self.add(timestamp, message)
+
+    def messages(self):
+        """Return the distinct messages in the order they were first added"""
+        return self._ranges.keys()
+
+    def get_timestamp_count(self, message):
+        """Return the number of distinct timestamps at which a message was
+        logged"""
+        ranges = self._ranges[message]
+        return sum(last - first + 1 for first, last in zip(ranges[::2], ranges[1::2]))
+
+    def get_ranges(self, message):
+        """Return the (first, last) timestamps of the ranges of a message"""
+        ranges = self._ranges[message]
+        return list(zip(ranges[::2], ranges[1::2]))
+
+
+def write_log_messages(log_messages, error_file, warning_file):
+    """Write (severity, timestamp, message) tuples into an error and a warning
+    log file, with the format of the log files of OSIValidatorLogger"""
+    for severity, timestamp, msg in log_messages:
+        line = f"{logging.getLevelName(severity):<7} -- [TS {timestamp}]{msg}\n"
+        if severity == 40:
+            error_file.write(line)
+        else:
+            warning_file.write(line)
 
 
-def print_synthesis(title, ranges_messages_table):
-    """Print the (range, messages) table in a nice way, precessed with title and
-    the number of messages"""
+def get_synthesis_table(aggregator):
+    """Return the (ranges of timestamps, message) rows of the messages
+    aggregated by an OSILogAggregator"""
+
+    def format_ranges(ran):
+        if ran[0] == ran[1]:
+            return str(ran[0])
+        return f"[{ran[0]}, {ran[1]}]"
+
+    wrapper_ranges = textwrap.TextWrapper(width=40)
+    wrapper = textwrap.TextWrapper(width=200)
+    results = []
+    for message_key in aggregator.messages():
+        ts_ranges = ", ".join(map(format_ranges, aggregator.get_ranges(message_key)))
+        results.append([wrapper_ranges.fill(ts_ranges), wrapper.fill(str(message_key))])
+    return results
+
+
+def format_synthesis(title, ranges_messages_table):
+    """Return the (range, messages) table in a nice way, precessed with title
+    and the number of messages"""
     headers = ["Ranges of timestamps", "Message"]
     title_string = title + " (" + str(len(ranges_messages_table)) + ") "
     table_string = tabulate(ranges_messages_table, headers=headers)
-    print(title_string)
-    print(table_string)
     return title_string + "\n" + table_string
 
 
+def print_synthesis(title, ranges_messages_table):
+    """Print the (range, messages) table in a nice way, precessed with title and
+    the number of messages"""
+    synthesis = format_synthesis(title, ranges_messages_table)
+    print(synthesis)
+    return synthesis
+
+
+def get_wilson_interval(failures, total, z=CONFIDENCE_Z):
+    """Return the Wilson score interval (low, high) of the rate of failures
+    among total trials. Unlike the normal approximation, it stays within
+    [0, 1] and is meaningful for rates close to 0 or 1 and small samples."""
+    if total == 0:
+        return 0.0, 1.0
+    rate = failures / total
+    z2 = z * z
+    denominator = 1 + z2 / total
+    center = (rate + z2 / (2 * total)) / denominator
+    margin = (
+        z * math.sqrt(rate * (1 - rate) / total + z2 / (4 * total * total))
+    ) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def get_failure_rates_table(aggregator, total):
+    """Return the (failing messages, failure rate, confidence interval,
+    message) rows of the messages aggregated by an OSILogAggregator over total
+    validated messages"""
+    wrapper = textwrap.TextWrapper(width=160)
+    results = []
+    for message_key in aggregator.messages():
+        failures = aggregator.get_timestamp_count(message_key)
+        low, high = get_wilson_interval(failures, total)
+        results.append(
+            [
+                failures,
+                f"{failures / total:.1%}",
+                f"[{low:.1%}, {high:.1%}]",
+                wrapper.fill(str(message_key)),
+            ]
+        )
+    return results
+
+
+def print_failure_rates(aggregator, total):
+    """Print the failure rate of each message logged over a sample of total
+    messages, with its confidence interval"""
+    _, high = get_wilson_interval(0, total)
+    headers = ["Failing messages", "Failure rate", "95% confidence", "Message"]
+    failure_rates = (
+        f"Failure rates over {total} sampled messages (95% confidence intervals, "
+        f"the rate of the rules which did not fail is at most {high:.1%})\n"
+        + tabulate(get_failure_rates_table(aggregator, total), headers=headers)
+    )
+    print(failure_rates)
+    return failure_rates
+
+
 SEVERITY = {
     osi_rules.Severity.INFO: "info",
     osi_rules.Severity.ERROR: "error",
@@ -0,0 +1,255 @@
+"""
+This module contains the VectorizedStep which checks the comparison rules of
+the elements of a repeated message field on NumPy columns instead of one
+field at a time.
+"""
+
+import math
+
+import numpy
+from google.protobuf.descriptor import FieldDescriptor
+import os, sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "."))
+
+import osi_rules_implementations
+
+# Minimum number of elements of a repeated field to check it on columns
+MIN_ELEMENTS = 16
+
+# Comparison rules and their equivalent on columns
+COMPARISONS = {
+    "is_less_than_or_equal_to": numpy.less_equal,
+    "is_less_than": numpy.less,
+    "is_greater_than_or_equal_to": numpy.greater_equal,
+    "is_greater_than": numpy.greater,
+    "is_equal_to": numpy.equal,
+    "is_different_to": numpy.not_equal,
+}
+
+# Type of the columns of the scalar fields that can be compared exactly
+COLUMN_TYPES = {
+    FieldDescriptor.CPPTYPE_INT32: numpy.int64,
+    FieldDescriptor.CPPTYPE_INT64: numpy.int64,
+    FieldDescriptor.CPPTYPE_UINT32: numpy.int64,
+    FieldDescriptor.CPPTYPE_UINT64: numpy.uint64,
+    FieldDescriptor.CPPTYPE_DOUBLE: numpy.float64,
+    FieldDescriptor.CPPTYPE_FLOAT: numpy.float64,
+    FieldDescriptor.CPPTYPE_BOOL: numpy.int64,
+    FieldDescriptor.CPPTYPE_ENUM: numpy.int64,
+}
+
+
+def compare(comparison, column, threshold):
+    """Compare a column with the number threshold of a rule. Integer columns
+    are compared with an integer of their type instead of being cast to
+    floats, so that the result is the same as the one of the comparison of
+    the field values in Python, e.g. for IDs above 2**53."""
+    if column.dtype.kind == "f":
+        return comparison(column, threshold)
+
+    if isinstance(threshold, float):
+        if not math.isfinite(threshold):
+            # Same result for all the integers
+            return numpy.full(len(column), comparison(0, threshold))
+        if not threshold.is_integer():
+            # x < t and x <= t are x < ceil(t), x > t and x >= t are x > floor(t)
+            if comparison in (numpy.less, numpy.less_equal):
+                comparison, threshold = numpy.less, math.ceil(threshold)
+            elif comparison in (numpy.greater, numpy.greater_equal):
+                comparison, threshold = numpy.greater, math.floor(threshold)
+            else:
+                return numpy.full(len(column), comparison(0, threshold))
+        threshold = int(threshold)
+
+    limits = numpy.iinfo(column.dtype)
+    if not limits.min <= threshold <= limits.max:
+        # Same result for all the values of the column type
+        bound = limits.min if threshold < limits.min else limits.max
+        return numpy.full(len(column), comparison(int(bound), threshold))
+    return comparison(column, column.dtype.type(threshold))
+
+
+def get_comparisons(step, chain=(), plans=()):
+    """Return the comparisons (chain of field names, rule, column type)
+    equivalent to a step of an execution plan, in the order they are checked,
+    or None if the step cannot be checked on columns.
+
+    Only comparisons of non-repeated scalar fields, possibly in non-repeated
+    message fields, can be checked on columns.
+    """
+    field_descriptor = step.field_descriptor
+    if (
+        step.implementation is None
+        or step.target is not None
+        or field_descriptor is None
+        or field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+        or not field_descriptor.has_presence
+    ):
+        return None
+
+    chain = chain + (step.field_name,)
+
+    if step.child_plan is not None:
+        if step.child_plan in plans:
+            # Recursive message type
+            return None
+        comparisons = []
+        for child_step in step.child_plan.steps:
+            child_comparisons = get_comparisons(
+                child_step, chain, plans + (step.child_plan,)
+            )
+            if child_comparisons is None:
+                return None
+            comparisons.extend(child_comparisons)
+        return comparisons
+
+    column_type = COLUMN_TYPES.get(field_descriptor.cpp_type)
+    if (
+        step.rule.verb not in COMPARISONS
+        or column_type is None
+        or not isinstance(step.rule.params, (int, float))
+    ):
+        return None
+    return [(chain, step.rule, column_type)]
+
+
+def vectorize_plans(plans):
+    """Set the vectorized step of the steps of the plans checking the children
+    of repeated fields whose rules contain comparisons"""
+    for plan in plans:
+        for step in plan.steps:
+            if (
+                step.child_plan is not None
+                and step.field_descriptor is not None
+                and step.field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+            ):
+                step.vectorized = VectorizedStep.from_step(step)
+
+
+def is_set(message, chain):
+    """Check if the field at the chain of field names of a message is set"""
+    for field_name in chain:
+        if not message.HasField(field_name):
+            return False
+        message = getattr(message, field_name)
+    return True
+
+
+class VectorizedStep:
+    """Check of the children of a repeated field where the comparison rules of
+    all the elements are evaluated at once on columns of values.
+
+    ``items`` are the steps of the plan of the elements in order. Each item
+    is a range (start, stop) of comparisons or a step that is checked element
+    by element.
+    """
+
+    def __init__(self, field_name):
+        self.field_name = field_name
+        self.items = []
+        self.comparisons = []
+        self.chains = []
+
+    @classmethod
+    def from_step(cls, step):
+        """Return the vectorized step equivalent to a step checking the
+        children of a repeated field, or None if it has no comparison"""
+        vectorized = cls(step.field_name)
+        for child_step in step.child_plan.steps:
+            comparisons = get_comparisons(child_step)
+            if comparisons is None:
+                vectorized.items.append(child_step)
+                continue
+
+            start = len(vectorized.comparisons)
+            for chain, rule, column_type in comparisons:
+                if (chain, column_type) not in vectorized.chains:
+                    vectorized.chains.append((chain, column_type))
+                column = vectorized.chains.index((chain, column_type))
+                vectorized.comparisons.append(
+                    (column, chain, rule, COMPARISONS[rule.verb])
+                )
+            vectorized.items.append((start, len(vectorized.comparisons)))
+
+        if not vectorized.comparisons:
+            return None
+        return vectorized
+
+    def get_columns(self, elements):
+        """Gather the values of the compared fields of the elements. The
+        values of unset fields are the default ones."""
+        messages = {(): elements}
+        columns = []
+        for chain, column_type in self.chains:
+            for length in range(1, len(chain)):
+                if chain[:length] not in messages:
+                    field_name = chain[length - 1]
+                    messages[chain[:length]] = [
+                        getattr(message, field_name)
+                        for message in messages[chain[: length - 1]]
+                    ]
+            field_name = chain[-1]
+            columns.append(
+                numpy.fromiter(
+                    (getattr(message, field_name) for message in messages[chain[:-1]]),
+                    column_type,
+                    len(elements),
+                )
+            )
+        return columns
+
+    def check(self, checker, parent_field, elements):
+        """Check the children of the repeated field of parent_field whose
+        elements are given, logging the failures in the same order as
+        check_children"""
+        columns = self.get_columns(elements)
+        fails = numpy.empty((len(elements), len(self.comparisons)), dtype=bool)
+        for index, (column, _, rule, comparison) in enumerate(self.comparisons):
+            numpy.logical_not(
+                compare(comparison, columns[column], rule.params),
+                out=fails[:, index],
+            )
+        element_indices, comparison_indices = (
+            indices.tolist() for indices in numpy.nonzero(fails)
+        )
+
+        path = parent_field.path + "." + self.field_name
+        failures = zip(element_indices, comparison_indices)
+
+        if all(isinstance(item, tuple) for item in self.items):
+            for element_index, comparison_index in failures:
+                self.log_failure(
+                    checker, path, elements[element_index], comparison_index
+                )
+            return True
+
+        failures = list(failures) + [(len(elements), 0)]
+        failure_index = 0
+        for element_index, element_field in enumerate(
+            parent_field.get_field(self.field_name)
+        ):
+            for item in self.items:
+                if not isinstance(item, tuple):
+                    checker.check_step(element_field, item)
+                    continue
+                while failures[failure_index][0] == element_index:
+                    comparison_index = failures[failure_index][1]
+                    if comparison_index >= item[1]:
+                        break
+                    self.log_failure(
+                        checker, path, elements[element_index], comparison_index
+                    )
+                    failure_index += 1
+        return True
+
+    def log_failure(self, checker, path, element, comparison_index):
+        """Log the failure of a comparison if the compared field is set"""
+        _, chain, rule, _ = self.comparisons[comparison_index]
+        if is_set(element, chain):
+            checker.log(
+                rule.severity,
+                osi_rules_implementations.get_failure_message(
+                    rule, path + "." + ".".join(chain)
+                ),
+            )
@@ -141,6 +141,7 @@ def gen_yml_rules(dir_name="rules", full_osi=False):
                     "  is_equal_to: any(num(), bool(), required=False)\n"
                     "  is_different_to: num(required=False)\n"
                     "  is_globally_unique: str(required=False)\n"
+                    "  is_stable_over_time: str(required=False)\n"
                     "  refers_to: str(required=False)\n"
                     "  is_iso_country_code: str(required=False)\n"
                     "  is_set: str(required=False)\n"
@@ -352,6 +353,7 @@ def gen_yml_rules(dir_name="rules", full_osi=False):
                                                     list_item
                                                     in [
                                                         "is_globally_unique",
+                                                        "is_stable_over_time",
                                                         "is_set",
                                                         "is_iso_country_code",
                                                     ]
@@ -49,9 +49,13 @@ if __name__ == "__main__":
             "ruamel.yaml>=0.18.5",
             "defusedxml>=0.7.1",
             "iso3166>=2.1.1",
+            "numpy>=1.24.0",
             "protobuf==4.24.4",
             "open-simulation-interface @ git+https://github.com/OpenSimulationInterface/open-simulation-interface.git@v3.7.0-rc1",
         ],
+        extras_require={
+            "zstd": ["zstandard>=0.22.0"],
+        },
         entry_points={
             "console_scripts": ["osivalidator=osivalidator.osi_general_validator:main"],
         },
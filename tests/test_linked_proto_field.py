@@ -0,0 +1,59 @@
+"""Module for test class of LinkedProtoField class"""
+
+import unittest
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
+from osivalidator.linked_proto_field import LinkedProtoField
+from osivalidator.osi_rules import Rule
+
+
+class TestLinkedProtoField(unittest.TestCase):
+    def setUp(self):
+        ground_truth = GroundTruth()
+        for index in range(3):
+            ground_truth.moving_object.add().id.value = index
+        ground_truth.host_vehicle_id.value = 1
+
+        self.field = LinkedProtoField(ground_truth, name="GroundTruth")
+
+    def test_repeated_field(self):
+        moving_objects = self.field.get_field("moving_object")
+
+        self.assertEqual(len(moving_objects), 3)
+        self.assertEqual(moving_objects[-1].value.id.value, 2)
+        self.assertEqual(
+            [moving_object.value.id.value for moving_object in moving_objects],
+            [0, 1, 2],
+        )
+        self.assertEqual(
+            [moving_object.value.id.value for moving_object in moving_objects[1:]],
+            [1, 2],
+        )
+        self.assertIs(moving_objects[0].parent, self.field)
+
+    def test_path(self):
+        moving_object = self.field.get_field("moving_object")[1]
+        object_id = moving_object.get_field("id")
+        self.assertEqual(object_id.path, "GroundTruth.moving_object.id")
+
+        moving_object.path = "GroundTruth.moving_object[1]"
+        self.assertEqual(
+            moving_object.get_field("id").path, "GroundTruth.moving_object[1].id"
+        )
+
+    def test_query(self):
+        rule = Rule(verb="is_set", target="this.host_vehicle_id.value")
+        self.assertEqual(rule.target_query, ("this", "host_vehicle_id"))
+        self.assertEqual(rule.targeted_field, "value")
+
+        host_vehicle_id = self.field.query(rule.target_query)
+        self.assertEqual(host_vehicle_id.path, "GroundTruth.host_vehicle_id")
+        self.assertEqual(
+            self.field.query("this.host_vehicle_id.value", parent=True).value,
+            host_vehicle_id.value,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
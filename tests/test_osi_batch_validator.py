@@ -0,0 +1,129 @@
+"""Module for test class of the validation of several traces"""
+
+import argparse
+import contextlib
+import io
+import os
+import struct
+import tempfile
+import unittest
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
+from osivalidator import osi_batch_validator
+
+
+class TestOSIBatchValidator(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.traces_dir = os.path.join(self.tmp_dir.name, "traces")
+        os.makedirs(os.path.join(self.traces_dir, "nested"))
+
+        # GroundTruth traces whose moving objects have the given types
+        self.paths = []
+        for name, object_types in [
+            ("valid_gt_.osi", [1, 2]),
+            ("invalid_gt_.osi", [1, 5]),
+            (os.path.join("nested", "nested_gt_.osi"), [5]),
+        ]:
+            path = os.path.join(self.traces_dir, name)
+            with open(path, "wb") as trace_file:
+                for _ in range(3):
+                    ground_truth = GroundTruth()
+                    for object_type in object_types:
+                        ground_truth.moving_object.add().type = object_type
+                    data = ground_truth.SerializeToString()
+                    trace_file.write(struct.pack("<L", len(data)) + data)
+            self.paths.append(path)
+
+        # Not a trace
+        open(self.paths[0] + ".idx", "wb").close()
+        open(os.path.join(self.traces_dir, "notes.txt"), "wb").close()
+
+        validator = osi_batch_validator.osi_validator.OSIValidator()
+        validator.rules.from_yaml(
+            """
+            GroundTruth:
+                moving_object:
+            MovingObject:
+                type:
+                    - is_less_than_or_equal_to: 4
+            """
+        )
+        osi_batch_validator.VALIDATOR = validator
+
+    def tearDown(self):
+        osi_batch_validator.VALIDATOR = None
+        self.tmp_dir.cleanup()
+
+    def test_find_traces(self):
+        valid, invalid, nested = self.paths
+        self.assertEqual(
+            osi_batch_validator.find_traces([self.traces_dir]), [invalid, valid]
+        )
+        self.assertEqual(
+            osi_batch_validator.find_traces(
+                [os.path.join(self.traces_dir, "**", "*.osi"), valid]
+            ),
+            [invalid, nested, valid],
+        )
+
+    def test_validate_traces(self):
+        args = argparse.Namespace(
+            output=os.path.join(self.tmp_dir.name, "output"),
+            rules=None,
+            rules_cache=None,
+            incremental=False,
+            timesteps=2,
+            max_errors=0,
+            buffer=0,
+            parallel=0,
+        )
+        traces = [(path, "GroundTruth") for path in self.paths]
+        with contextlib.redirect_stdout(io.StringIO()):
+            summaries = osi_batch_validator.validate_traces(args, traces)
+
+        self.assertEqual([summary.messages for summary in summaries], [2, 2, 2])
+        self.assertEqual(
+            [summary.is_valid for summary in summaries], [True, False, False]
+        )
+        self.assertEqual(len(summaries[1].logs), 2)
+        self.assertEqual(
+            sorted(os.listdir(args.output)),
+            [
+                "error_invalid_gt_.osi.log",
+                "error_nested_gt_.osi.log",
+                "error_valid_gt_.osi.log",
+                "summary.log",
+                "summary_invalid_gt_.osi.log",
+                "summary_nested_gt_.osi.log",
+                "summary_valid_gt_.osi.log",
+                "warn_invalid_gt_.osi.log",
+                "warn_nested_gt_.osi.log",
+                "warn_valid_gt_.osi.log",
+            ],
+        )
+        with open(os.path.join(args.output, "summary_invalid_gt_.osi.log")) as f:
+            self.assertIn("[0, 1]", f.read())
+
+        # The logged messages of each trace are in its log files
+        failure = (
+            "MovingObject.type.is_less_than_or_equal_to(4) does not comply in "
+            "GroundTruth.moving_object.type"
+        )
+        with open(os.path.join(args.output, "error_invalid_gt_.osi.log")) as f:
+            self.assertEqual(
+                f.read(), f"ERROR   -- [TS 0]{failure}\nERROR   -- [TS 1]{failure}\n"
+            )
+        with open(os.path.join(args.output, "error_valid_gt_.osi.log")) as f:
+            self.assertEqual(f.read(), "")
+
+        # The traces stop at the first error
+        args.max_errors = 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            summaries = osi_batch_validator.validate_traces(args, traces)
+        self.assertEqual([summary.messages for summary in summaries], [2, 1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
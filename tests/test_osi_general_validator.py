@@ -1,6 +1,30 @@
+import glob
+import os
+import struct
+import subprocess
+import sys
+import tempfile
 import unittest
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
 from osivalidator.osi_general_validator import detect_message_type
 
+# The rules of MovingObject.vehicle_attributes are missing, so that the check
+# of a message with vehicle attributes raises after logging errors
+RULES = """
+GroundTruth:
+    moving_object:
+MovingObject:
+    type:
+        - is_less_than_or_equal_to: 4
+    vehicle_attributes:
+"""
+SCHEMA = """
+GroundTruth: any(required=False)
+MovingObject: any(required=False)
+"""
+
 
 class TestDetectMessageType(unittest.TestCase):
     def test_detect_message_type_sensor_data(self):
@@ -64,5 +88,106 @@ class TestDetectMessageType(unittest.TestCase):
         self.assertEqual(message_type, "SensorView")
 
 
+class TestValidateTrace(unittest.TestCase):
+    """Command line validation of a trace file"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_dir = os.path.join(self.tmp_dir.name, "rules")
+        os.makedirs(os.path.join(self.rules_dir, "schema"))
+        with open(os.path.join(self.rules_dir, "osi_test.yml"), "w") as f:
+            f.write(RULES)
+        with open(
+            os.path.join(self.rules_dir, "schema", "osi_test_schema.yml"), "w"
+        ) as f:
+            f.write(SCHEMA)
+
+        # Types of the moving objects of each message, the object of type 1 of
+        # the third message has vehicle attributes
+        self.path = os.path.join(self.tmp_dir.name, "trace_gt_.osi")
+        with open(self.path, "wb") as trace_file:
+            for timestep, object_types in enumerate(
+                [[6, 5], [1], [5, 1], [2], [6, 5], [7]]
+            ):
+                ground_truth = GroundTruth()
+                for object_type in object_types:
+                    moving_object = ground_truth.moving_object.add()
+                    moving_object.type = object_type
+                    if timestep == 2 and object_type == 1:
+                        moving_object.vehicle_attributes.SetInParent()
+                data = ground_truth.SerializeToString()
+                trace_file.write(struct.pack("<L", len(data)) + data)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def validate(self, *options):
+        """Validate the trace with the command line options. Return the
+        output, the error log and the warning log."""
+        output = tempfile.mkdtemp(dir=self.tmp_dir.name)
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "osivalidator.osi_general_validator",
+                "--data",
+                self.path,
+                "--rules",
+                self.rules_dir,
+                "--output",
+                output,
+                "--no-rules-cache",
+                *options,
+            ],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        )
+        logs = []
+        for prefix in ["error_", "warn_"]:
+            (log_path,) = glob.glob(os.path.join(output, prefix + "*.log"))
+            with open(log_path) as log_file:
+                logs.append(log_file.read())
+        return (result.stdout, *logs)
+
+    def test_parallel(self):
+        serial_output, serial_errors, serial_warnings = self.validate()
+        self.assertIn("Type not found: MovingObject.VehicleAttributes", serial_output)
+        # The errors logged before the exception are in the log
+        self.assertIn("[TS 2]", serial_errors)
+        self.assertEqual(serial_errors.count("ERROR"), 6)
+
+        self.assertEqual(
+            self.validate("--parallel", "2"),
+            (serial_output, serial_errors, serial_warnings),
+        )
+
+    def test_stop(self):
+        for options in [
+            (),
+            ("--from-timestep", "0"),
+            ("--read-ahead", "2"),
+            ("--parallel", "2"),
+        ]:
+            with self.subTest(options=options):
+                # Both errors of the first message are output
+                output, errors, _ = self.validate("--fail-fast", *options)
+                self.assertIn(
+                    "Validation stopped at the first invalid message "
+                    "(timestep 0, 2 errors)",
+                    output,
+                )
+                self.assertEqual(errors.count("[TS 0]"), 2)
+                self.assertEqual(errors.count("ERROR"), 2)
+
+                # The errors of the third message are not counted as its
+                # check raises, the limit is reached in the fifth message
+                output, errors, _ = self.validate("--max-errors", "3", *options)
+                self.assertIn("Validation stopped after 4 errors", output)
+                self.assertEqual(errors.count("[TS 4]"), 2)
+                self.assertNotIn("[TS 5]", errors)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,97 @@
+"""Module for test class of the rules cache of OSIRules"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from osivalidator import osi_rules
+from osivalidator.osi_rules import OSIRules, ProtoMessagePath
+
+
+class TestRulesCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_path = self.tmp_dir.name
+        self.cache_path = os.path.join(self.rules_path, ".osi_rules_cache")
+
+        os.mkdir(os.path.join(self.rules_path, "schema"))
+        with open(
+            os.path.join(self.rules_path, "schema", "osi_object_schema.yml"), "w"
+        ) as schema_file:
+            schema_file.write("MovingObject: any(required=False)\n")
+        self.write_rules("- is_less_than_or_equal_to: 4")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_rules(self, type_rules):
+        with open(os.path.join(self.rules_path, "osi_object.yml"), "w") as rule_file:
+            rule_file.write("MovingObject:\n    type:\n        " + type_rules + "\n")
+
+    def load(self):
+        """Collect the rules with the cache and return them and the number of
+        validated rule files"""
+        rules = OSIRules()
+        with mock.patch.object(
+            OSIRules, "validate_rules_yml", autospec=True, return_value=True
+        ) as validate_rules_yml:
+            rules.from_yaml_directory(self.rules_path, self.cache_path)
+        type_rules = rules.rules.get_type(ProtoMessagePath(["MovingObject"]))
+        return type_rules["type"].rules, validate_rules_yml.call_count
+
+    def test_cache(self):
+        rules, validated_count = self.load()
+        self.assertEqual(validated_count, 1)
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        cached_rules, validated_count = self.load()
+        self.assertEqual(validated_count, 0)
+        self.assertEqual(cached_rules, rules)
+        self.assertEqual(
+            str(cached_rules["is_less_than_or_equal_to"].path),
+            "MovingObject.type.is_less_than_or_equal_to",
+        )
+
+    def test_changed_rule_file(self):
+        self.load()
+        self.write_rules("- is_less_than_or_equal_to: 5")
+
+        rules, validated_count = self.load()
+        self.assertEqual(validated_count, 1)
+        self.assertEqual(rules["is_less_than_or_equal_to"].params, 5)
+
+    def test_invalid_cache(self):
+        with open(self.cache_path, "wb") as cache_file:
+            cache_file.write(b"invalid")
+
+        rules, validated_count = self.load()
+        self.assertEqual(validated_count, 1)
+        self.assertEqual(rules["is_less_than_or_equal_to"].params, 4)
+
+    def test_package_version(self):
+        self.load()
+        with mock.patch.object(
+            osi_rules, "get_package_version", return_value="0.0.0-other"
+        ):
+            _, validated_count = self.load()
+        self.assertEqual(validated_count, 1)
+
+    def test_default_cache_path(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        cache_home = cache_dir.name
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}):
+            self.cache_path = osi_rules.get_rules_cache_path(self.rules_path)
+            self.load()
+        self.assertEqual(
+            os.path.dirname(self.cache_path), os.path.join(cache_home, "osivalidator")
+        )
+        self.assertTrue(os.path.exists(self.cache_path))
+        self.assertEqual(
+            sorted(os.listdir(self.rules_path)), ["osi_object.yml", "schema"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
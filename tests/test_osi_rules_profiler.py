@@ -0,0 +1,78 @@
+"""Module for test class of OSIRulesProfiler class"""
+
+import os
+import tempfile
+import unittest
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
+from osivalidator.linked_proto_field import LinkedProtoField
+from osivalidator.osi_rules_checker import OSIRulesChecker
+from osivalidator.osi_rules_profiler import OSIRulesProfiler, get_profile_key
+from osivalidator.osi_validator_logger import OSIValidatorLogger
+
+# The rule tree has to be built with the modules used by the checker
+from osivalidator.osi_rules_checker import osi_rules
+
+
+class TestOSIRulesProfiler(unittest.TestCase):
+    def test_get_profile_key(self):
+        self.assertEqual(
+            get_profile_key(("MovingObject", "type", "is_less_than")),
+            ("MovingObject", "type", "is_less_than"),
+        )
+        self.assertEqual(
+            get_profile_key(
+                ("MovingObject", "vehicle_attributes", "check_if", "is_set")
+            ),
+            ("MovingObject", "vehicle_attributes", "check_if.is_set"),
+        )
+
+    def test_profile(self):
+        rules = osi_rules.OSIRules()
+        rules.from_yaml(
+            """
+            GroundTruth:
+                moving_object:
+            MovingObject:
+                type:
+                    - is_less_than_or_equal_to: 4
+            Identifier:
+                value:
+            """
+        )
+        ground_truth = GroundTruth()
+        for object_type in [1, 5, 2]:
+            ground_truth.moving_object.add().type = object_type
+
+        logger = OSIValidatorLogger()
+        logger.init_collect_only(False)
+        checker = OSIRulesChecker(logger)
+        profiler = OSIRulesProfiler()
+        profiler.attach(checker)
+        checker.check_plan(
+            LinkedProtoField(ground_truth, name="GroundTruth"),
+            rules.compile("GroundTruth", GroundTruth.DESCRIPTOR),
+        )
+
+        calls, failures, total, cumulative = profiler.stats[
+            ("MovingObject", "type", "is_less_than_or_equal_to")
+        ]
+        self.assertEqual((calls, failures), (3, 1))
+        self.assertLessEqual(total, cumulative)
+
+        calls, failures, total, cumulative = profiler.stats[
+            ("GroundTruth", "moving_object", "check_children")
+        ]
+        self.assertEqual((calls, failures), (1, 0))
+        self.assertLess(total, cumulative)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "profile.log")
+            profiler.write(path)
+            with open(path, encoding="utf-8") as profile_file:
+                self.assertIn("is_less_than_or_equal_to", profile_file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""Module for test class of OSITraceColumns class"""
+
+import os
+import struct
+import tempfile
+import unittest
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
+from osivalidator.osi_trace_columns import OSITraceColumns, get_comparisons
+from osivalidator.osi_trace_reader import OSITraceReader
+from osivalidator.osi_validator import OSIValidator
+from osivalidator.osi_validator_logger import OSILogAggregator
+
+RULES = """
+GroundTruth:
+    moving_object:
+MovingObject:
+    type:
+        - is_less_than_or_equal_to: {max_type}
+    base:
+    vehicle_attributes:
+        - check_if:
+            - is_equal_to: 2
+              target: this.type
+          do_check:
+            - is_set:
+BaseMoving:
+    dimension:
+Dimension3d:
+    length:
+        - is_greater_than: 0.5
+"""
+
+
+class TestOSITraceColumns(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "trace_gt_.osi")
+        self.messages = []
+
+        with open(self.path, "wb") as trace_file:
+            for object_types in [[1, 5], [], [6, 2, 3]]:
+                ground_truth = GroundTruth()
+                for object_type in object_types:
+                    moving_object = ground_truth.moving_object.add()
+                    moving_object.type = object_type
+                    if object_type != 1:
+                        moving_object.base.dimension.length = object_type / 10
+                data = ground_truth.SerializeToString()
+                trace_file.write(struct.pack("<L", len(data)) + data)
+                self.messages.append(ground_truth)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_validator(self, max_type=4):
+        validator = OSIValidator()
+        validator.rules.from_yaml(RULES.format(max_type=max_type))
+        return validator
+
+    def load_columns(self, validator):
+        """Return the columns, the comparisons and the position of the trace
+        reader after loading the columns"""
+        comparisons = get_comparisons(
+            validator.rules.compile("GroundTruth", GroundTruth.DESCRIPTOR)
+        )
+        trace = OSITraceReader(self.path, GroundTruth)
+        try:
+            columns = OSITraceColumns.load_or_extract(self.path, trace, comparisons)
+            return columns, comparisons, trace.position
+        finally:
+            trace.close()
+
+    def test_comparisons(self):
+        comparisons = get_comparisons(
+            self.get_validator().rules.compile("GroundTruth", GroundTruth.DESCRIPTOR)
+        )
+        self.assertEqual(
+            [
+                (comparison.table, comparison.chain, comparison.rule.verb)
+                for comparison in comparisons
+            ],
+            [
+                (("moving_object",), ("type",), "is_less_than_or_equal_to"),
+                (
+                    ("moving_object",),
+                    ("base", "dimension", "length"),
+                    "is_greater_than",
+                ),
+            ],
+        )
+
+    def test_check(self):
+        validator = self.get_validator()
+        columns, comparisons, _ = self.load_columns(validator)
+
+        name = "GroundTruth.moving_object.base.dimension.length"
+        self.assertEqual(
+            columns.columns["GroundTruth.moving_object#timestep"].tolist(),
+            [0, 0, 2, 2, 2],
+        )
+        self.assertEqual(
+            columns.columns[name + "#set"].tolist(),
+            [False, True, True, True, True],
+        )
+        self.assertEqual(columns.columns[name].tolist(), [0.0, 0.5, 0.6, 0.2, 0.3])
+
+        aggregator = OSILogAggregator()
+        columns.check(comparisons, aggregator)
+
+        # Same failures as when the messages are validated one at a time
+        expected = self.get_validator().validate_stream(self.messages)
+        for message in aggregator.messages():
+            self.assertEqual(
+                aggregator.get_ranges(message), expected.get_ranges(message)
+            )
+        self.assertEqual(len(aggregator), 5)
+
+        # Only the rows of a window of timesteps
+        window_aggregator = OSILogAggregator()
+        columns.check(comparisons, window_aggregator, range(1, 3))
+        self.assertEqual(len(window_aggregator), 3)
+        self.assertEqual(
+            [
+                window_aggregator.get_ranges(message)
+                for message in window_aggregator.messages()
+            ],
+            [[(2, 2)], [(2, 2)]],
+        )
+        self.assertEqual(
+            [str(message) for message in aggregator.messages()],
+            [
+                "MovingObject.type.is_less_than_or_equal_to(4) does not comply in "
+                "GroundTruth.moving_object.type",
+                "Dimension3d.length.is_greater_than(0.5) does not comply in "
+                "GroundTruth.moving_object.base.dimension.length",
+            ],
+        )
+
+    def test_load_or_extract(self):
+        self.load_columns(self.get_validator())
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    OSITraceColumns.get_columns_path(self.path),
+                    "GroundTruth.moving_object.type.npy",
+                )
+            )
+        )
+
+        # Other thresholds are checked on the stored columns
+        columns, comparisons, position = self.load_columns(self.get_validator(5))
+        self.assertEqual(position, 0)
+        aggregator = OSILogAggregator()
+        columns.check(comparisons, aggregator)
+        self.assertEqual(len(aggregator), 4)
+
+        # The columns are extracted again when the trace changes
+        with open(self.path, "ab") as trace_file:
+            data = self.messages[0].SerializeToString()
+            trace_file.write(struct.pack("<L", len(data)) + data)
+        columns, _, position = self.load_columns(self.get_validator())
+        self.assertEqual(position, os.path.getsize(self.path))
+        self.assertEqual(
+            columns.columns["GroundTruth.moving_object#timestep"].tolist(),
+            [0, 0, 2, 2, 2, 3, 3],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Module for test class of the synthetic trace generator of the benchmarks"""
+
+import os
+import tempfile
+import unittest
+
+from osi3.osi_sensordata_pb2 import SensorData
+
+from benchmarks.osi_trace_generator import get_trace_name, write_trace
+from osivalidator.osi_general_validator import detect_message_type
+from osivalidator.osi_trace_reader import OSITraceReader
+
+
+class TestOSITraceGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, seed):
+        path = os.path.join(self.tmp_dir.name, name)
+        write_trace(path, "SensorData", 3, 5, 2, 10, seed)
+        return path
+
+    def test_deterministic(self):
+        with open(self.write("a.osi", 0), "rb") as trace_file:
+            data = trace_file.read()
+        with open(self.write("b.osi", 0), "rb") as trace_file:
+            self.assertEqual(trace_file.read(), data)
+        with open(self.write("c.osi", 1), "rb") as trace_file:
+            self.assertNotEqual(trace_file.read(), data)
+
+    def test_trace(self):
+        name = get_trace_name("SensorData", 3, 5, 2, 10)
+        self.assertEqual(detect_message_type(name), "SensorData")
+
+        reader = OSITraceReader(self.write(name, 0), SensorData)
+        messages = list(reader)
+        reader.close()
+
+        self.assertEqual(len(messages), 3)
+        ground_truth = messages[-1].sensor_view[0].global_ground_truth
+        self.assertEqual(len(ground_truth.moving_object), 5)
+        self.assertEqual(len(ground_truth.lane), 2)
+        self.assertEqual(len(ground_truth.lane_boundary), 3)
+        self.assertEqual(len(ground_truth.lane_boundary[0].boundary_line), 10)
+        self.assertEqual(messages[-1].timestamp.nanos, 200000000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Module for test class of OSITraceIndex class"""
+
+import os
+import struct
+import tempfile
+import unittest
+
+from osi3.osi_sensorview_pb2 import SensorView
+
+from osivalidator.osi_trace_index import OSITraceIndex, get_message_ranges
+from osivalidator.osi_trace_reader import OSITraceReader
+
+
+class TestOSITraceIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "trace_sv_.osi")
+
+        with open(self.path, "wb") as trace_file:
+            for index in range(5):
+                sensor_view = SensorView()
+                sensor_view.version.version_major = 3
+                sensor_view.timestamp.seconds = index // 2
+                sensor_view.timestamp.nanos = (index % 2) * 500000000
+                sensor_view.sensor_id.value = index
+                data = sensor_view.SerializeToString()
+                trace_file.write(struct.pack("<L", len(data)) + data)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_message_ranges(self):
+        with open(os.path.join(self.tmp_dir.name, "trace.osi"), "wb") as trace_file:
+            for message in [b"abc", b"", b"defgh"]:
+                trace_file.write(struct.pack("<L", len(message)) + message)
+
+        message_ranges = list(get_message_ranges(trace_file.name))
+        self.assertEqual(message_ranges, [(4, 3), (11, 0), (15, 5)])
+
+    def test_build(self):
+        index = OSITraceIndex.build(self.path, SensorView)
+
+        self.assertEqual(len(index), 5)
+        self.assertEqual(
+            list(index.timestamps),
+            [0, 500000000, 1000000000, 1500000000, 2000000000],
+        )
+        trace = OSITraceReader(self.path, SensorView)
+        try:
+            for index_id in [3, 1]:
+                message = trace.read_message(
+                    index.offsets[index_id], index.sizes[index_id]
+                )
+                self.assertEqual(message.sensor_id.value, index_id)
+        finally:
+            trace.close()
+
+    def test_load_or_build(self):
+        index = OSITraceIndex.load_or_build(self.path, SensorView)
+        index_path = OSITraceIndex.get_index_path(self.path)
+        self.assertTrue(os.path.exists(index_path))
+
+        loaded_index = OSITraceIndex.load(index_path, os.stat(self.path))
+        self.assertEqual(loaded_index.offsets, index.offsets)
+        self.assertEqual(loaded_index.sizes, index.sizes)
+        self.assertEqual(loaded_index.timestamps, index.timestamps)
+
+        # The index is outdated as soon as the trace changes
+        with open(self.path, "ab") as trace_file:
+            trace_file.write(struct.pack("<L", 0))
+        self.assertIsNone(OSITraceIndex.load(index_path, os.stat(self.path)))
+        self.assertEqual(len(OSITraceIndex.load_or_build(self.path, SensorView)), 6)
+
+    def test_select(self):
+        index = OSITraceIndex.build(self.path, SensorView)
+
+        self.assertEqual(list(index.select()), [0, 1, 2, 3, 4])
+        self.assertEqual(list(index.select(from_timestep=3)), [3, 4])
+        self.assertEqual(list(index.select(1, 2)), [1, 2])
+        self.assertEqual(list(index.select(to_timestep=10)), [0, 1, 2, 3, 4])
+        self.assertEqual(list(index.select(timestamp_range=(0.5, 1.5))), [1, 2, 3])
+        self.assertEqual(list(index.select(2, None, (0.5, 1.5))), [2, 3])
+
+    def test_sample(self):
+        index = OSITraceIndex.build(self.path, SensorView)
+        indices = index.select()
+
+        self.assertEqual(list(index.sample(indices, every=2)), [0, 2, 4])
+        self.assertEqual(index.sample(indices, interval=1.0), [0, 2, 4])
+        self.assertEqual(index.sample([1, 3, 4], interval=1.0), [1, 3])
+        self.assertEqual(index.sample(indices, count=10), indices)
+
+        sample = index.sample(indices, count=3, seed=1)
+        self.assertEqual(len(sample), 3)
+        self.assertEqual(sample, sorted(set(sample)))
+        self.assertEqual(index.sample(indices, count=3, seed=1), sample)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Module for test class of OSITraceReader class"""
+
+import gzip
+import lzma
+import os
+import struct
+import tempfile
+import unittest
+
+from osi3.osi_sensorview_pb2 import SensorView
+
+from osivalidator.osi_trace_index import get_message_ranges
+from osivalidator.osi_trace_reader import (
+    OSITraceReader,
+    read_ahead,
+    read_serialized_messages,
+)
+
+
+class TestOSITraceReader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "trace_sv_.osi")
+        self.positions = []
+
+        with open(self.path, "wb") as trace_file:
+            for index in range(3):
+                sensor_view = SensorView()
+                sensor_view.sensor_id.value = index
+                data = sensor_view.SerializeToString()
+                trace_file.write(struct.pack("<L", len(data)) + data)
+                self.positions.append(trace_file.tell())
+
+            # Truncated message at the end of the trace
+            trace_file.write(struct.pack("<L", 100) + b"abc")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_reader(self, buffer_size):
+        reader = OSITraceReader(self.path, SensorView, buffer_size)
+
+        positions = []
+        for index, message in enumerate(reader):
+            self.assertEqual(message.sensor_id.value, index)
+            positions.append(reader.position)
+        self.assertEqual(positions, self.positions)
+
+        message = reader.read_message(
+            self.positions[1] + 4, self.positions[2] - 4 - self.positions[1]
+        )
+        self.assertEqual(message.sensor_id.value, 2)
+        reader.close()
+
+    def test_mmap(self):
+        self.check_reader(0)
+
+    def test_buffered(self):
+        self.check_reader(16)
+
+    def test_empty(self):
+        open(self.path, "wb").close()
+        for buffer_size in [0, 16]:
+            reader = OSITraceReader(self.path, SensorView, buffer_size)
+            self.assertEqual(list(reader), [])
+            reader.close()
+
+    def test_read_ahead(self):
+        message_ranges = (
+            (index, offset, size)
+            for index, (offset, size) in enumerate(get_message_ranges(self.path))
+        )
+        messages = [
+            (index, SensorView.FromString(data).sensor_id.value)
+            for index, _, data in read_ahead(
+                read_serialized_messages(self.path, message_ranges), 1
+            )
+        ]
+        # The truncated message is not read
+        self.assertEqual(messages, [(0, 0), (1, 1), (2, 2)])
+
+        # The reader thread stops when the messages are not consumed anymore
+        messages = read_ahead(read_serialized_messages(self.path, [(0, 4, 2)] * 10), 2)
+        self.assertEqual(next(messages)[1], 6)
+        messages.close()
+
+        def invalid_ranges():
+            yield 0, 4, 2
+            raise ValueError("invalid range")
+
+        with self.assertRaises(ValueError):
+            list(read_ahead(read_serialized_messages(self.path, invalid_ranges()), 1))
+
+    def test_compressed(self):
+        with open(self.path, "rb") as trace_file:
+            data = trace_file.read()
+
+        for extension, compress in [(".gz", gzip.compress), (".xz", lzma.compress)]:
+            path = self.path + extension
+            with open(path, "wb") as trace_file:
+                trace_file.write(compress(data))
+
+            # The buffer size is ignored for compressed traces
+            reader = OSITraceReader(path, SensorView, 0)
+            self.assertIsNotNone(reader.compression)
+            messages = [message.sensor_id.value for message in reader]
+            self.assertEqual(messages, [0, 1, 2])
+            self.assertEqual(reader.position, self.positions[-1])
+            self.assertEqual(reader.file_position, os.path.getsize(path))
+            reader.close()
+
+            self.assertEqual(
+                [index for index, _, _ in read_serialized_messages(path)], [0, 1, 2]
+            )
+            # The progress is in compressed bytes
+            self.assertLessEqual(
+                sum(progress for _, progress, _ in read_serialized_messages(path)),
+                os.path.getsize(path),
+            )
+            self.assertEqual(
+                list(get_message_ranges(path)), list(get_message_ranges(self.path))
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""Module for test class of the validation server"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
+from osivalidator.osi_trace_reader import HEADER
+from osivalidator.osi_validation_server import (
+    ConnectionHandler,
+    create_server,
+    get_percentiles,
+    parse_address,
+)
+
+
+class TestOSIValidationServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_path = rules_path = self.tmp_dir.name
+        os.mkdir(os.path.join(rules_path, "schema"))
+        with open(
+            os.path.join(rules_path, "schema", "osi_object_schema.yml"), "w"
+        ) as schema_file:
+            schema_file.write(
+                "GroundTruth: any(required=False)\n"
+                "MovingObject: any(required=False)\n"
+            )
+        with open(os.path.join(rules_path, "osi_object.yml"), "w") as rule_file:
+            rule_file.write(
+                "GroundTruth:\n"
+                "    moving_object:\n"
+                "MovingObject:\n"
+                "    type:\n"
+                "        - is_less_than_or_equal_to: 4\n"
+            )
+
+        self.server = create_server("localhost:0", "GroundTruth", rules_path, None, 1)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_parse_address(self):
+        self.assertEqual(
+            parse_address("unix:/tmp/osi.sock"), (socket.AF_UNIX, "/tmp/osi.sock")
+        )
+        self.assertEqual(
+            parse_address("localhost:1234"), (socket.AF_INET, ("localhost", 1234))
+        )
+
+    def test_get_percentiles(self):
+        self.assertEqual(
+            get_percentiles(range(100, 0, -1), (50, 90, 99)), {50: 50, 90: 90, 99: 99}
+        )
+        self.assertEqual(get_percentiles([3.0], (50,)), {50: 3.0})
+
+    def test_verdicts(self):
+        with socket.create_connection(self.server.server_address) as connection:
+            for object_type in [1, 5, 2]:
+                ground_truth = GroundTruth()
+                ground_truth.moving_object.add().type = object_type
+                data = ground_truth.SerializeToString()
+                connection.sendall(HEADER.pack(len(data)) + data)
+            connection.sendall(HEADER.pack(3) + b"bad")
+            connection.shutdown(socket.SHUT_WR)
+
+            verdicts = []
+            with connection.makefile("rb") as stream:
+                while header := stream.read(HEADER.size):
+                    verdicts.append(json.loads(stream.read(HEADER.unpack(header)[0])))
+
+        self.assertEqual([verdict["timestep"] for verdict in verdicts], [0, 1, 2, 3])
+        self.assertEqual(
+            [verdict["valid"] for verdict in verdicts], [True, False, True, False]
+        )
+        self.assertEqual(
+            verdicts[1]["errors"],
+            [
+                "MovingObject.type.is_less_than_or_equal_to(4) does not comply in "
+                "GroundTruth.moving_object.type"
+            ],
+        )
+        self.assertIsNone(verdicts[1]["failure"])
+        self.assertIsNotNone(verdicts[3]["failure"])
+
+    def test_max_pending(self):
+        with self.assertRaises(ValueError):
+            create_server("localhost:0", "GroundTruth", self.rules_path, None, 1, 0)
+
+        server = create_server(
+            "localhost:0", "GroundTruth", self.rules_path, None, 1, 2
+        )
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        # Messages submitted to the workers and whose verdict is not sent yet
+        in_flight = []
+        counts = {"submitted": 0, "sent": 0}
+        apply_async = server.pool.apply_async
+        send_verdict = ConnectionHandler.send_verdict
+
+        def submit(*args):
+            counts["submitted"] += 1
+            in_flight.append(counts["submitted"] - counts["sent"])
+            return apply_async(*args)
+
+        def send(*args):
+            counts["sent"] += 1
+            return send_verdict(*args)
+
+        try:
+            with mock.patch.object(
+                server.pool, "apply_async", submit
+            ), mock.patch.object(ConnectionHandler, "send_verdict", send):
+                with socket.create_connection(server.server_address) as connection:
+                    ground_truth = GroundTruth()
+                    for object_type in range(50):
+                        ground_truth.moving_object.add().type = object_type
+                    data = ground_truth.SerializeToString()
+                    for _ in range(20):
+                        connection.sendall(HEADER.pack(len(data)) + data)
+                    connection.shutdown(socket.SHUT_WR)
+                    with connection.makefile("rb") as stream:
+                        while header := stream.read(HEADER.size):
+                            stream.read(HEADER.unpack(header)[0])
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+
+        self.assertEqual(counts["sent"], 20)
+        self.assertLessEqual(max(in_flight), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
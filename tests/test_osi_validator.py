@@ -0,0 +1,157 @@
+"""Module for test class of OSIValidator class"""
+
+import unittest
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
+from osivalidator.osi_validator import OSIValidator
+
+
+class TestOSIValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = OSIValidator()
+        self.validator.rules.from_yaml(
+            """
+            GroundTruth:
+                moving_object:
+            MovingObject:
+                id:
+                    - is_stable_over_time:
+                type:
+                    - is_less_than_or_equal_to: 4
+            Identifier:
+                value:
+            """
+        )
+
+    def get_message(self, object_types):
+        ground_truth = GroundTruth()
+        for identifier, object_type in enumerate(object_types):
+            moving_object = ground_truth.moving_object.add()
+            moving_object.id.value = identifier
+            moving_object.type = object_type
+        return ground_truth
+
+    def test_validate(self):
+        report = self.validator.validate(self.get_message([1, 2]))
+        self.assertEqual(report.timestep, 0)
+        self.assertTrue(report.is_valid)
+
+        report = self.validator.validate(self.get_message([1, 5]))
+        self.assertEqual(report.timestep, 1)
+        self.assertFalse(report.is_valid)
+        self.assertEqual(
+            report.errors,
+            [
+                "MovingObject.type.is_less_than_or_equal_to(4) does not comply in "
+                "GroundTruth.moving_object.type"
+            ],
+        )
+        self.assertEqual(report.warnings, [])
+
+    def test_validate_stream(self):
+        messages = [self.get_message([1, 5]), self.get_message([1])]
+        messages += [self.get_message([1, 5]) for _ in range(2)]
+        aggregator = self.validator.validate_stream(messages)
+
+        self.assertEqual(
+            [str(message) for message in aggregator.messages()],
+            [
+                "MovingObject.type.is_less_than_or_equal_to(4) does not comply in "
+                "GroundTruth.moving_object.type",
+                "MovingObject.id.is_stable_over_time(None) does not comply in "
+                "GroundTruth.moving_object.id",
+            ],
+        )
+        ranges = [aggregator.get_ranges(message) for message in aggregator.messages()]
+        self.assertEqual(ranges, [[(0, 0), (2, 3)], [(2, 2)]])
+
+        # A new trace starts from the first timestep
+        self.validator.reset()
+        self.assertEqual(self.validator.validate(self.get_message([1])).timestep, 0)
+
+    def test_incremental(self):
+        messages = [self.get_message([1, 5]), self.get_message([1])]
+        messages += [self.get_message([1, 5]) for _ in range(2)]
+        reports = [self.validator.validate(message) for message in messages]
+
+        validator = OSIValidator(incremental=True)
+        validator.rules = self.validator.rules
+        for message, report in zip(messages, reports):
+            incremental_report = validator.validate(message)
+            self.assertEqual(incremental_report.errors, report.errors)
+            self.assertEqual(incremental_report.warnings, report.warnings)
+
+        # The type is checked once per distinct moving object, the ID in every
+        # message
+        plan = validator.rules.compile("GroundTruth", GroundTruth.DESCRIPTOR)
+        moving_object_plan = next(
+            step.child_plan for step in plan.steps if step.field_name == "moving_object"
+        )
+        self.assertFalse(moving_object_plan.is_local)
+        self.assertTrue(moving_object_plan.has_local_steps)
+        is_local = {step.rule.verb: step.is_local for step in moving_object_plan.steps}
+        self.assertFalse(is_local["is_stable_over_time"])
+        self.assertTrue(is_local["is_less_than_or_equal_to"])
+        self.assertEqual(len(validator.checker.next_verdicts), 2)
+
+        # A new trace is also validated incrementally
+        validator.reset()
+        self.assertTrue(validator.checker.incremental)
+
+    def test_compound_rules(self):
+        validator = OSIValidator()
+        validator.rules.from_yaml(
+            """
+            GroundTruth:
+                moving_object:
+                    - first_element:
+                        type:
+                            - is_equal_to: 2
+            MovingObject:
+                type:
+                    - check_if:
+                        - is_greater_than: 2
+                          target: this.type
+                      do_check:
+                        - is_less_than_or_equal_to: 4
+            Identifier:
+                value:
+            """
+        )
+        first_element = validator.rules.rules["GroundTruth"]["moving_object"][
+            "first_element"
+        ]
+        check_if = validator.rules.rules["MovingObject"]["type"]["check_if"]
+
+        nested_rules = None
+        for _ in range(2):
+            report = validator.validate(self.get_message([1, 5, 3]))
+            self.assertEqual(
+                report.errors,
+                [
+                    "GroundTruth.moving_object.first_element.is_equal_to(2) does not "
+                    "comply in GroundTruth.moving_object.type",
+                    "GroundTruth.moving_object.first_element({'type': "
+                    "[{'is_equal_to': 2}]}) does not comply in "
+                    "GroundTruth.moving_object",
+                    "MovingObject.type.check_if.is_less_than_or_equal_to(4) does "
+                    "not comply in GroundTruth.moving_object.type",
+                    "MovingObject.type.check_if([{'is_greater_than': 2, 'target': "
+                    "'this.type'}]) does not comply in GroundTruth.moving_object",
+                ],
+            )
+
+            # The nested rules are built once and the parameters are unchanged
+            if nested_rules is None:
+                nested_rules = check_if.get_nested_rules()
+            self.assertIs(check_if.get_nested_rules(), nested_rules)
+            self.assertEqual(first_element.params, {"type": [{"is_equal_to": 2}]})
+
+        statements, checks = nested_rules
+        self.assertEqual(statements[0].target, "this.type")
+        self.assertEqual(checks[0].verb, "is_less_than_or_equal_to")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Module for test class of OSILogAggregator class"""
+
+import pickle
+import random
+import unittest
+
+from osivalidator.osi_validator_logger import (
+    OSILogAggregator,
+    get_failure_rates_table,
+    get_wilson_interval,
+)
+from osivalidator.osi_rules import ProtoMessagePath, Rule
+from osivalidator.osi_rules_implementations import get_failure_message
+
+
+class TestOSILogAggregator(unittest.TestCase):
+    def test_ranges(self):
+        aggregator = OSILogAggregator()
+        aggregator.extend(
+            [(30, timestamp, "warning") for timestamp in [0, 1, 1, 2, 5, 7, 8]]
+        )
+        aggregator.add(3, "error")
+        aggregator.extend([(40, 4, "error"), (40, 4, "error")])
+
+        self.assertEqual(len(aggregator), 10)
+        self.assertEqual(aggregator.error_count, 2)
+        self.assertEqual(aggregator.first_error_timestamp, 4)
+        self.assertEqual(list(aggregator.messages()), ["warning", "error"])
+        self.assertEqual(aggregator.get_ranges("warning"), [(0, 2), (5, 5), (7, 8)])
+        self.assertEqual(aggregator.get_ranges("error"), [(3, 4)])
+        self.assertEqual(aggregator.get_timestamp_count("warning"), 6)
+
+    def test_unordered_timestamps(self):
+        timestamps = [random.randrange(100) for _ in range(300)]
+        aggregator = OSILogAggregator()
+        for timestamp in timestamps:
+            aggregator.add(timestamp, "message")
+
+        ranges = []
+        for timestamp in sorted(set(timestamps)):
+            if ranges and ranges[-1][1] == timestamp - 1:
+                ranges[-1] = (ranges[-1][0], timestamp)
+            else:
+                ranges.append((timestamp, timestamp))
+        self.assertEqual(aggregator.get_ranges("message"), ranges)
+
+    def test_rule_failures(self):
+        rule = Rule(
+            verb="is_less_than",
+            params=4,
+            path=ProtoMessagePath(["MovingObject", "type", "is_less_than"]),
+        )
+        path = "GroundTruth.moving_object.type"
+        failures = [get_failure_message(rule, path) for _ in range(2)]
+
+        aggregator = OSILogAggregator()
+        for timestamp, failure in enumerate(failures):
+            aggregator.add(timestamp, failure)
+        aggregator.add(2, pickle.loads(pickle.dumps(failures[0])))
+
+        self.assertEqual(len(aggregator.messages()), 1)
+        self.assertEqual(aggregator.get_ranges(failures[1]), [(0, 2)])
+        self.assertEqual(
+            str(failures[0]),
+            "MovingObject.type.is_less_than(4) does not comply in " + path,
+        )
+
+    def test_failure_rates(self):
+        low, high = get_wilson_interval(10, 100)
+        self.assertAlmostEqual(low, 0.0552, places=4)
+        self.assertAlmostEqual(high, 0.1744, places=4)
+        self.assertEqual(get_wilson_interval(0, 20)[0], 0.0)
+        self.assertAlmostEqual(get_wilson_interval(0, 20)[1], 0.1611, places=4)
+        self.assertEqual(get_wilson_interval(20, 20)[1], 1.0)
+        self.assertEqual(get_wilson_interval(0, 0), (0.0, 1.0))
+
+        aggregator = OSILogAggregator()
+        aggregator.extend([(30, timestamp, "warning") for timestamp in [0, 3, 3, 9]])
+        self.assertEqual(
+            get_failure_rates_table(aggregator, 10),
+            [[3, "30.0%", "[10.8%, 60.3%]", "warning"]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,8 @@ from glob import *
 import os
 import shutil
 import yamale
+from osi3.osi_groundtruth_pb2 import GroundTruth
+from osi3.osi_common_pb2 import Vector3d
 from osivalidator.osi_rules import (
     Rule,
     TypeRulesContainer,
@@ -63,6 +65,52 @@ class TestValidationRules(unittest.TestCase):
 
         self.assertEqual(field["is_set"], rule_check)
 
+    def test_compile(self):
+        """Test the compilation of the rules into an execution plan"""
+        raw = """
+        Vector3d:
+            x:
+                - is_greater_than: 0
+                - is_optional:
+            y:
+                - is_set:
+        """
+        validation_rules = OSIRules()
+        validation_rules.from_yaml(raw)
+        plan = validation_rules.compile("Vector3d", Vector3d.DESCRIPTOR)
+
+        self.assertEqual(
+            [(step.field_name, step.rule.verb) for step in plan.steps],
+            [("x", "is_greater_than"), ("y", "is_set")],
+        )
+        self.assertIs(plan, validation_rules.compile("Vector3d", Vector3d.DESCRIPTOR))
+
+    def test_compile_special_type(self):
+        """Test that the nested types of BaseMoving are used for the base of
+        moving objects in an execution plan"""
+        raw = """
+        GroundTruth:
+            moving_object:
+        MovingObject:
+            base:
+        BaseMoving:
+            dimension:
+                length:
+                    - is_greater_than: 1
+        Dimension3d:
+            length:
+                - is_greater_than: 0
+        """
+        validation_rules = OSIRules()
+        validation_rules.from_yaml(raw)
+        plan = validation_rules.compile("GroundTruth", GroundTruth.DESCRIPTOR)
+
+        for field_name in ["moving_object", "base", "dimension"]:
+            step = next(step for step in plan.steps if step.field_name == field_name)
+            plan = step.child_plan
+
+        self.assertEqual([step.rule.params for step in plan.steps], [1])
+
     def test_yaml_generation(self):
         gen_yml_rules("unit_test_rules/")
 
@@ -0,0 +1,180 @@
+"""Module for test class of the rules checked on columns"""
+
+import operator
+import unittest
+
+import numpy
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
+from osivalidator.linked_proto_field import LinkedProtoField
+from osivalidator.osi_rules_checker import OSIRulesChecker
+from osivalidator.osi_validator_logger import OSIValidatorLogger
+
+# The rule tree has to be built with the modules used by the checker
+from osivalidator.osi_rules_checker import osi_rules, osi_vectorized_rules
+
+
+class TestVectorizedRules(unittest.TestCase):
+    """Test that rules checked on columns log the same messages as the rules
+    checked field by field"""
+
+    def setUp(self):
+        raw = """
+        GroundTruth:
+            moving_object:
+            lane_boundary:
+        MovingObject:
+            base:
+                - is_set:
+            type:
+                - is_less_than_or_equal_to: 4
+            VehicleAttributes:
+                radius_wheel:
+        BaseMoving:
+            dimension:
+        Identifier:
+            value:
+        Vector3d:
+            x:
+        Orientation3d:
+            yaw:
+        Dimension3d:
+            length:
+                - is_greater_than: 0.5
+            width:
+                - is_less_than: 3
+        LaneBoundary:
+            BoundaryPoint:
+                width:
+                    - is_greater_than_or_equal_to: 0
+                    - is_less_than: 1
+                dash:
+                    - is_less_than_or_equal_to: 5
+        """
+        self.rules = osi_rules.OSIRules()
+        self.rules.from_yaml(raw)
+
+        ground_truth = GroundTruth()
+        for index in range(osi_vectorized_rules.MIN_ELEMENTS + 4):
+            moving_object = ground_truth.moving_object.add()
+            moving_object.type = index % 7
+            if index % 3:
+                moving_object.base.dimension.length = index % 4 * 0.3
+            if index % 5:
+                moving_object.base.dimension.width = index % 5
+
+        lane_boundary = ground_truth.lane_boundary.add()
+        for index in range(osi_vectorized_rules.MIN_ELEMENTS):
+            boundary_point = lane_boundary.boundary_line.add()
+            boundary_point.width = (index % 4 - 1) * 0.5
+            if index % 2:
+                boundary_point.dash = index
+
+        self.ground_truth = ground_truth
+
+    def check(self):
+        logger = OSIValidatorLogger()
+        logger.init_collect_only(False)
+        checker = OSIRulesChecker(logger)
+        checker.check_plan(
+            LinkedProtoField(self.ground_truth, name="GroundTruth"),
+            self.rules.compile("GroundTruth", GroundTruth.DESCRIPTOR),
+        )
+        return logger.log_messages[-1]
+
+    def test_vectorized_steps(self):
+        plan = self.rules.compile("GroundTruth", GroundTruth.DESCRIPTOR)
+        steps = {step.field_name: step for step in plan.steps if step.child_plan}
+        moving_object_step = steps["moving_object"]
+        lane_boundary_step = steps["lane_boundary"]
+
+        # The base and type fields are compared on columns, the other rules of
+        # MovingObject are checked element by element
+        vectorized = moving_object_step.vectorized
+        ranges = [item for item in vectorized.items if isinstance(item, tuple)]
+        self.assertEqual(ranges, [(0, 2), (2, 3)])
+        self.assertEqual(
+            [chain for chain, _ in vectorized.chains],
+            [
+                ("base", "dimension", "length"),
+                ("base", "dimension", "width"),
+                ("type",),
+            ],
+        )
+
+        boundary_line_step = lane_boundary_step.child_plan.steps[0]
+        self.assertEqual(len(boundary_line_step.vectorized.comparisons), 3)
+
+    def test_same_logs(self):
+        messages = self.check()
+        self.assertTrue(messages)
+
+        for plan in self.rules.plans.values():
+            for step in plan.steps:
+                step.vectorized = None
+        self.assertEqual(self.check(), messages)
+
+    def test_large_ids(self):
+        """IDs are compared as integers, not as floats"""
+        self.rules = osi_rules.OSIRules()
+        self.rules.from_yaml(
+            """
+            GroundTruth:
+                moving_object:
+            MovingObject:
+                id:
+            Identifier:
+                value:
+                    - is_less_than_or_equal_to: 9007199254740993
+                    - is_greater_than: 2.5
+            """
+        )
+        self.ground_truth = GroundTruth()
+        for index in range(osi_vectorized_rules.MIN_ELEMENTS):
+            moving_object = self.ground_truth.moving_object.add()
+            moving_object.id.value = 2**53 + index % 4 if index % 2 else index
+
+        plan = self.rules.compile("GroundTruth", GroundTruth.DESCRIPTOR)
+        (vectorized,) = [step.vectorized for step in plan.steps if step.vectorized]
+        self.assertEqual(vectorized.chains, [(("id", "value"), numpy.uint64)])
+
+        messages = self.check()
+        self.assertEqual(len(messages), 6)
+
+        for plan in self.rules.plans.values():
+            for step in plan.steps:
+                step.vectorized = None
+        self.assertEqual(self.check(), messages)
+
+    def test_compare(self):
+        """Integer columns compare as the field values in Python"""
+        operators = {
+            "is_less_than_or_equal_to": operator.le,
+            "is_less_than": operator.lt,
+            "is_greater_than_or_equal_to": operator.ge,
+            "is_greater_than": operator.gt,
+            "is_equal_to": operator.eq,
+            "is_different_to": operator.ne,
+        }
+        values = [0, 1, 2, 2**53, 2**53 + 1, 2**64 - 1]
+        column = numpy.array(values, dtype=numpy.uint64)
+        for verb, comparison in osi_vectorized_rules.COMPARISONS.items():
+            for threshold in [
+                -1,
+                1.5,
+                2**53 + 1,
+                float(2**53),
+                2**64,
+                float("nan"),
+            ]:
+                with self.subTest(verb=verb, threshold=threshold):
+                    self.assertEqual(
+                        osi_vectorized_rules.compare(
+                            comparison, column, threshold
+                        ).tolist(),
+                        [operators[verb](value, threshold) for value in values],
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
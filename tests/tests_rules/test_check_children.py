@@ -0,0 +1,48 @@
+"""Module for test class of check_children rule implementation"""
+
+import unittest
+
+from osi3.osi_common_pb2 import BaseMoving
+
+from osivalidator.linked_proto_field import LinkedProtoField
+from osivalidator.osi_rules_checker import OSIRulesChecker
+
+# The rule tree has to be built with the module used by the checker
+from osivalidator.osi_rules_checker import osi_rules
+
+
+class TestCheckChildren(unittest.TestCase):
+    """Test for rule check_children"""
+
+    def setUp(self):
+        self.FRC = OSIRulesChecker()
+
+        raw = """
+        BaseMoving:
+            position:
+        Vector3d:
+            x:
+                - is_greater_than: 0
+        """
+        self.rules = osi_rules.OSIRules()
+        self.rules.from_yaml(raw)
+        self.type_rules = self.rules.get_rules().get_type("BaseMoving")
+
+        base = BaseMoving()
+        base.position.x = 1
+        self.BASE = LinkedProtoField(base, name="BaseMoving")
+
+    def tearDown(self):
+        del self.FRC
+
+    def test_comply(self):
+        self.assertTrue(self.FRC.check_children(self.BASE, self.type_rules))
+
+    def test_default_rules_derived_once(self):
+        self.FRC.check_children(self.BASE, self.type_rules)
+        position_rules = self.type_rules.get_field("position")
+        default_rule = position_rules.get_rule("check_children")
+
+        self.FRC.check_children(self.BASE, self.type_rules)
+        self.assertIs(position_rules, self.type_rules.get_field("position"))
+        self.assertIs(default_rule, position_rules.get_rule("check_children"))
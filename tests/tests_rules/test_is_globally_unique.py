@@ -5,6 +5,7 @@ from osivalidator.osi_rules_checker import OSIRulesChecker
 from osi3.osi_sensorview_pb2 import SensorView
 from osivalidator.linked_proto_field import LinkedProtoField
 from osivalidator.osi_rules import Rule, TypeRulesContainer, ProtoMessagePath
+from osivalidator.osi_validator_logger import OSIValidatorLogger
 
 
 class TestIsGlobalUnique(unittest.TestCase):
@@ -48,3 +49,39 @@ class TestIsGlobalUnique(unittest.TestCase):
         self.FRC.is_globally_unique(self.linked_sid2, rule)
         index_dict = self.FRC.id_manager._index
         self.assertEqual(2, len(index_dict))
+
+    def test_reset(self):
+        """
+        Test that the ID index is emptied for the next timestep
+        """
+        rule = Rule(verb="is_globally_unique", field_name="sensor_id")
+        self.FRC.is_globally_unique(self.linked_sid, rule)
+        self.FRC.reset()
+        self.FRC.is_globally_unique(self.linked_sid, rule)
+        self.assertEqual(1, len(self.FRC.id_manager._index[0]))
+
+    def test_resolve_unicity(self):
+        """
+        Test the messages logged for IDs used by several objects
+        """
+        logger = OSIValidatorLogger()
+        logger.init_collect_only(False)
+        self.FRC = OSIRulesChecker(logger)
+
+        rule = Rule(verb="is_globally_unique", field_name="sensor_id")
+        self.FRC.is_globally_unique(self.linked_sid2, rule)
+        self.FRC.is_globally_unique(self.linked_sid, rule)
+        self.FRC.is_globally_unique(self.linked_sid2, rule)
+        self.FRC.id_manager.resolve_unicity(0)
+
+        self.assertEqual(
+            logger.log_messages[0],
+            [
+                (30, 0, "Several objects of type SensorView, SensorView have the ID 2"),
+                (
+                    40,
+                    0,
+                    "Several objects of the same type have the ID 2:2 SensorView",
+                ),
+            ],
+        )
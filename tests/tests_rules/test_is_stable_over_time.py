@@ -0,0 +1,83 @@
+"""Module for test class of is_stable_over_time rule implementation"""
+
+import unittest
+
+from osi3.osi_groundtruth_pb2 import GroundTruth
+
+from osivalidator.osi_rules_checker import OSIRulesChecker
+from osivalidator.linked_proto_field import LinkedProtoField
+from osivalidator.osi_validator_logger import OSIValidatorLogger
+
+# The rule has to be built with the module used by the checker
+from osivalidator.osi_rules_checker import osi_rules
+
+
+class TestIsStableOverTime(unittest.TestCase):
+    def setUp(self):
+        self.logger = OSIValidatorLogger()
+        self.logger.init_collect_only(False)
+        self.FRC = OSIRulesChecker(self.logger)
+        self.rule = osi_rules.Rule(
+            verb="is_stable_over_time",
+            path=osi_rules.ProtoMessagePath(
+                ["MovingObject", "id", "is_stable_over_time"]
+            ),
+        )
+
+    def tearDown(self):
+        del self.FRC
+
+    def check_timestep(self, timestep, objects):
+        """Check the IDs of the (id, is stationary) objects of a timestep and
+        return the logged messages"""
+        ground_truth = GroundTruth()
+        linked_gt = LinkedProtoField(ground_truth, name="GroundTruth")
+        self.FRC.reset()
+        self.FRC.set_timestamp(ground_truth.timestamp, timestep)
+
+        for identifier, is_stationary in objects:
+            if is_stationary:
+                new_object = ground_truth.stationary_object.add()
+            else:
+                new_object = ground_truth.moving_object.add()
+            new_object.id.value = identifier
+            linked_object = LinkedProtoField(
+                new_object, name="moving_object", parent=linked_gt
+            )
+            self.assertTrue(
+                self.FRC.is_stable_over_time(linked_object.get_field("id"), self.rule)
+            )
+
+        self.FRC.resolve_id_observations()
+        return [
+            str(message) for _, _, message in self.logger.log_messages.get(timestep, [])
+        ]
+
+    def test_comply_is_stable_over_time(self):
+        for timestep in range(3):
+            self.assertEqual(
+                self.check_timestep(timestep, [(0, False), (1, False)]), []
+            )
+        self.assertEqual(len(self.FRC.id_tracker), 2)
+        self.assertEqual(list(self.FRC.id_tracker.last_timesteps), [2, 2])
+
+    def test_not_comply_is_stable_over_time(self):
+        failure = "MovingObject.id.is_stable_over_time(None) does not comply in GroundTruth.moving_object.id"
+
+        self.assertEqual(self.check_timestep(0, [(0, False), (1, False)]), [])
+        # ID 1 disappears
+        self.assertEqual(self.check_timestep(1, [(0, False)]), [])
+        # ID 1 reappears
+        self.assertEqual(self.check_timestep(2, [(0, False), (1, False)]), [failure])
+        # ID 0 is reused for another type of object
+        self.assertEqual(self.check_timestep(3, [(0, True), (1, False)]), [failure])
+
+    def test_skipped_timesteps(self):
+        """Only the processed timesteps are compared"""
+        self.assertEqual(self.check_timestep(0, [(0, False)]), [])
+        self.assertEqual(self.check_timestep(5, [(0, False)]), [])
+        self.assertEqual(self.check_timestep(10, [(0, False)]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
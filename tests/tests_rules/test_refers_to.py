@@ -7,6 +7,7 @@ from osivalidator.linked_proto_field import LinkedProtoField
 from osi3.osi_sensorview_pb2 import SensorView
 from osi3.osi_groundtruth_pb2 import GroundTruth
 from osivalidator.osi_rules import Rule, ProtoMessagePath, TypeRulesContainer
+from osivalidator.osi_validator_logger import OSIValidatorLogger
 
 
 class TestRefersTo(unittest.TestCase):
@@ -77,3 +78,27 @@ class TestRefersTo(unittest.TestCase):
         self.assertEqual(references_list[0][0].host_vehicle_id.value, 0)
         self.assertEqual(references_list[0][1], 0)
         self.assertEqual(references_list[0][2], "MovingObject")
+
+    def test_resolve_references(self):
+        """
+        Check that references are resolved to objects of the expected type
+        """
+        logger = OSIValidatorLogger()
+        logger.init_collect_only(False)
+        self.FRC = OSIRulesChecker(logger)
+
+        rule = Rule(
+            verb="refers_to", params="MovingObject", field_name="host_vehicle_id"
+        )
+        self.FRC.refers_to(self.linked_hvid1, rule)
+        self.FRC.refers_to(self.linked_hvid2, rule)
+
+        ground_truth = GroundTruth()
+        self.FRC.id_manager.register_message(0, ground_truth.moving_object.add())
+        self.FRC.id_manager.register_message(1, ground_truth.stationary_object.add())
+        self.FRC.id_manager.resolve_references(0)
+
+        self.assertEqual(
+            logger.log_messages[0],
+            [(40, 0, "Reference unresolved: GroundTruth to MovingObject (ID: 1)")],
+        )